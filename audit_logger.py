@@ -4,41 +4,82 @@ API请求审计日志模块
 企业版Token监控系统
 """
 
-import logging
+import atexit
+import itertools
 import json
+import queue
+import threading
+import time
+from collections import Counter, deque
 from datetime import datetime
 from typing import Optional
 from fastapi import Request
 import os
 
+from config_manager import config
+
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
 # 审计日志配置
 AUDIT_LOG_FILE = os.getenv("AUDIT_LOG_FILE", "api_audit.log")
 REQUEST_ID_HEADER = "X-Request-ID"
 
+# 毫秒粒度的时间戳缓存: (毫秒tick, ISO时间, 日志行时间bytes)，同一毫秒内的记录复用格式化结果
+_ts_cache = (-1, "", b"")
+
+
+def _timestamps():
+    """返回当前毫秒的ISO时间和日志行时间"""
+    global _ts_cache
+    tick = time.time_ns() // 1_000_000
+    if tick != _ts_cache[0]:
+        seconds, millis = divmod(tick, 1000)
+        now = datetime.fromtimestamp(seconds)
+        _ts_cache = (
+            tick,
+            f"{now.isoformat()}.{millis:03d}",
+            f"{now.strftime('%Y-%m-%d %H:%M:%S')},{millis:03d}".encode()
+        )
+    return _ts_cache[1], _ts_cache[2]
+
 
 class AuditLogger:
     """API审计日志器"""
     
     def __init__(self):
-        self.logger = logging.getLogger("audit")
-        self.logger.setLevel(logging.INFO)
+        # 文件写入 - 请求路径只把预编码好的整行bytes入队，由后台线程写文件
+        # 行格式与原logging格式保持一致: "%(asctime)s | %(levelname)s | %(message)s"
+        self._queue = queue.Queue(maxsize=10000)
+        self.dropped_lines = 0
+        # 合并写入: 攒够buffer_size行或等待buffer_time_ms后一次系统调用写出
+        self._batch_size = min(max(1, config.get_int('logging', 'audit_buffer_size', 128)), 1024)
+        self._batch_time = config.get_int('logging', 'audit_buffer_time_ms', 50) / 1000
+        self._writer = threading.Thread(target=self._write_loop, name="audit-writer", daemon=True)
+        self._writer.start()
+        self._closed = False
+        atexit.register(self.close)
         
-        # 文件处理器
-        handler = logging.FileHandler(AUDIT_LOG_FILE, encoding='utf-8')
-        handler.setFormatter(logging.Formatter(
-            '%(asctime)s | %(levelname)s | %(message)s'
-        ))
-        self.logger.addHandler(handler)
-        
-        # 内存存储最近1000条审计记录
-        self.recent_logs = []
+        # 内存存储最近1000条审计记录（环形缓冲）
         self.max_recent = 1000
+        self.recent_logs = deque(maxlen=self.max_recent)
+        
+        # 增量统计，与recent_logs保持同步
+        self.status_counts = Counter()
+        self.path_counts = Counter()
     
     def log_request(self, request: Request, user: Optional[dict] = None, 
                     status_code: int = 200, duration_ms: float = 0):
         """记录API请求"""
+        timestamp, asctime = _timestamps()
         audit_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp,
             "method": request.method,
             "path": request.url.path,
             "client_ip": request.client.host if request.client else "unknown",
@@ -49,41 +90,97 @@ class AuditLogger:
             "request_id": request.headers.get(REQUEST_ID_HEADER, "none")
         }
         
-        # 内存存储
+        # 内存存储 - 缓冲区满时先扣除即将被淘汰条目的计数
+        if len(self.recent_logs) == self.max_recent:
+            evicted = self.recent_logs[0]
+            self._discount(self.status_counts, evicted["status_code"])
+            self._discount(self.path_counts, evicted["path"])
         self.recent_logs.append(audit_entry)
-        if len(self.recent_logs) > self.max_recent:
-            self.recent_logs.pop(0)
+        self.status_counts[status_code] += 1
+        self.path_counts[audit_entry["path"]] += 1
         
         # 文件日志
-        self.logger.info(json.dumps(audit_entry, ensure_ascii=False))
+        line = b"%s | INFO | %s\n" % (asctime, _dumps(audit_entry))
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped_lines += 1
         
         return audit_entry
     
+    def _write_loop(self):
+        """后台写入线程，按批合并写入"""
+        fd = os.open(AUDIT_LOG_FILE, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            stopping = False
+            while not stopping:
+                line = self._queue.get()
+                if line is None:
+                    break
+                batch = [line]
+                deadline = time.monotonic() + self._batch_time
+                while len(batch) < self._batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        line = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if line is None:
+                        stopping = True
+                        break
+                    batch.append(line)
+                self._write_batch(fd, batch)
+        finally:
+            os.close(fd)
+    
+    @staticmethod
+    def _write_batch(fd: int, batch: list):
+        """一次writev写出整批，部分写入时补写剩余内容"""
+        if hasattr(os, "writev"):
+            written = os.writev(fd, batch)
+            total = sum(map(len, batch))
+            if written >= total:
+                return
+            data = memoryview(b"".join(batch))[written:]
+        else:
+            data = memoryview(b"".join(batch))
+        while data:
+            data = data[os.write(fd, data):]
+    
+    def close(self):
+        """停止后台写入线程并刷新剩余日志"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._writer.join()
+    
+    async def aclose(self):
+        """异步关闭（供应用shutdown时调用）"""
+        self.close()
+    
     def get_recent_logs(self, limit: int = 100) -> list:
         """获取最近审计日志"""
-        return self.recent_logs[-limit:]
+        start = max(0, len(self.recent_logs) - limit)
+        return list(itertools.islice(self.recent_logs, start, None))
+    
+    @staticmethod
+    def _discount(counter: Counter, key):
+        """计数减一，归零时移除键"""
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
     
     def get_stats(self) -> dict:
         """获取审计统计"""
         if not self.recent_logs:
             return {"total": 0}
         
-        total = len(self.recent_logs)
-        status_counts = {}
-        path_counts = {}
-        
-        for log in self.recent_logs:
-            status = log.get("status_code", 0)
-            status_counts[status] = status_counts.get(status, 0) + 1
-            
-            path = log.get("path", "unknown")
-            path_counts[path] = path_counts.get(path, 0) + 1
-        
         return {
-            "total": total,
-            "status_distribution": status_counts,
-            "top_paths": dict(sorted(path_counts.items(), 
-                                   key=lambda x: x[1], reverse=True)[:10])
+            "total": len(self.recent_logs),
+            "status_distribution": dict(self.status_counts),
+            "top_paths": dict(self.path_counts.most_common(10))
         }
 
 
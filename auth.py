@@ -5,10 +5,14 @@ JWT认证模块
 """
 
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Union
 from jose import JWTError, jwt
+from cachetools import TTLCache
 import hashlib
+import hmac
 import os
+import threading
+import time
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 if not SECRET_KEY:
@@ -17,14 +21,27 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
+# scrypt参数 (n=2^14, r=8, p=1 约占用16MB内存)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    hashed = hashlib.sha256(plain_password.encode()).hexdigest()
-    return hashed == hashed_password
+
+def _scrypt(password: str, salt: bytes) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+
+
+def verify_password(plain_password: str, hashed_password: Union[str, bytes]) -> bool:
+    stored = bytes.fromhex(hashed_password) if isinstance(hashed_password, str) else hashed_password
+    salt, digest = stored[:SALT_BYTES], stored[SALT_BYTES:]
+    return hmac.compare_digest(_scrypt(plain_password, salt), digest)
 
 
 def get_password_hash(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+    """生成加盐哈希，返回 salt+digest 的十六进制串"""
+    salt = os.urandom(SALT_BYTES)
+    return (salt + _scrypt(password, salt)).hex()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -39,10 +56,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+# 已验证令牌缓存：同一令牌在TTL内重复请求时跳过签名校验
+_token_cache = TTLCache(maxsize=4096, ttl=60)
+_token_cache_lock = threading.RLock()
+
+
 def decode_token(token: str) -> dict:
     from fastapi import HTTPException, status
+    with _token_cache_lock:
+        payload = _token_cache.get(token)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with _token_cache_lock:
+            _token_cache[token] = payload
         return payload
     except JWTError:
         raise HTTPException(
@@ -65,6 +94,10 @@ MOCK_USERS_DB = {
     }
 }
 
+# 存储的哈希预先解码为bytes，校验时省去十六进制转换
+for _user in MOCK_USERS_DB.values():
+    _user["password"] = bytes.fromhex(_user["password"])
+
 
 def authenticate_user(username: str, password: str) -> Optional[dict]:
     user = MOCK_USERS_DB.get(username)
@@ -5,39 +5,90 @@ Redis缓存管理器
 """
 
 import json
+import os
+import socket
 import asyncio
+import hashlib
 import redis.asyncio as redis
 import logging
 from typing import Optional, Any, Dict, List
 from datetime import datetime, timedelta
 from functools import wraps
 
+from cachetools import TLRUCache
+
 from config_manager import config
 from error_handling import DatabaseError
 
+try:
+    import orjson
+
+    def _dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(value: Any) -> bytes:
+        return json.dumps(value, default=str).encode()
+
+    _loads = json.loads
+
+# 缓存值使用msgpack二进制编码（体积更小），未安装时沿用JSON
+try:
+    import msgpack
+
+    def _pack(value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True, default=str)
+
+    def _unpack(data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+except ImportError:
+    _pack, _unpack = _dumps, _loads
+
 
 class CacheManager:
     """Redis缓存管理器 - 企业级缓存解决方案"""
     
     def __init__(self):
         self.redis = None
+        self._pool = None
         self.default_ttl = 300
+        # 进程内L1缓存，值为(剩余TTL, 序列化数据)，过期时间取Redis剩余TTL与l1_ttl的较小者
+        # 保存bytes而非对象，命中时重新解码，避免调用方修改结果污染缓存
+        self.l1_ttl = 30
+        self._l1 = TLRUCache(maxsize=2048, ttu=self._l1_ttu)
+        self._invalidation_task: Optional[asyncio.Task] = None
+    
+    def _l1_ttu(self, _key, value, now):
+        return now + min(value[0], self.l1_ttl)
     
     async def initialize(self):
         """初始化Redis连接"""
         try:
-            host = config.get('cache', 'redis_host', 'localhost')
-            port = config.get_int('cache', 'redis_port', 6379)
-            db = config.get_int('cache', 'redis_db', 0)
-            password = config.get('cache', 'redis_password', '')
+            settings = config.settings
+            host = settings.redis_host
+            port = settings.redis_port
+            db = settings.redis_db
+            password = settings.redis_password
             
-            self.redis = redis.from_url(
+            # 连接池按CPU核数放大并开启TCP keepalive，减少高并发下的排队与重连
+            keepalive_options = {}
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                keepalive_options[socket.TCP_KEEPIDLE] = 30
+            
+            # 缓存值以bytes存取，由msgpack/orjson直接编解码
+            self._pool = redis.ConnectionPool.from_url(
                 f"redis://:{password}@{host}:{port}/{db}" if password else f"redis://{host}:{port}/{db}",
-                encoding="utf-8",
-                decode_responses=True
+                max_connections=max(32, 4 * (os.cpu_count() or 1)),
+                socket_keepalive=True,
+                socket_keepalive_options=keepalive_options,
+                health_check_interval=30,
+                retry_on_timeout=True
             )
+            self.redis = redis.Redis(connection_pool=self._pool)
             
             await self.redis.ping()
+            self._invalidation_task = asyncio.create_task(self._listen_invalidations(db))
             
             logging.info("Redis缓存初始化成功")
             
@@ -45,22 +96,57 @@ class CacheManager:
             logging.error(f"Redis缓存初始化失败: {e}")
             raise DatabaseError(f"Failed to initialize cache: {e}")
     
+    async def _listen_invalidations(self, db: int):
+        """订阅键空间事件，其他进程删除/过期的键同步从L1移除
+        
+        需要Redis开启 notify-keyspace-events（至少包含 Egx），未开启时L1仅依赖自身TTL
+        """
+        try:
+            pubsub = self.redis.pubsub()
+            await pubsub.subscribe(*(f"__keyevent@{db}__:{event}" for event in ("del", "expired", "evicted")))
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    key = message["data"]
+                    self._l1.pop(key.decode() if isinstance(key, bytes) else key, None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(f"L1缓存失效订阅中断: {e}")
+    
+    def clear_local(self):
+        """清空进程内L1缓存"""
+        self._l1.clear()
+    
     async def close(self):
         """关闭Redis连接"""
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            self._invalidation_task = None
+        self._l1.clear()
         if self.redis:
             await self.redis.aclose()
+            # 显式传入的连接池不会随客户端关闭，需要单独断开
+            if self._pool:
+                await self._pool.disconnect()
             logging.info("Redis缓存已关闭")
     
     async def get(self, key: str) -> Optional[Any]:
         """获取缓存值"""
         try:
+            entry = self._l1.get(key)
+            if entry is not None:
+                return _unpack(entry[1])
+            
             if not self.redis:
                 return None
-                
-            value = await self.redis.get(key)
+            
+            async with self.redis.pipeline(transaction=False) as pipe:
+                value, remaining = await pipe.get(key).ttl(key).execute()
             if value:
                 logging.debug(f"缓存命中: {key}")
-                return json.loads(value)
+                if remaining > 0:
+                    self._l1[key] = (remaining, value)
+                return _unpack(value)
             return None
             
         except Exception as e:
@@ -74,9 +160,10 @@ class CacheManager:
                 return False
                 
             ttl = ttl or self.default_ttl
-            serialized_value = json.dumps(value, default=str)
+            serialized_value = _pack(value)
             
             await self.redis.setex(key, ttl, serialized_value)
+            self._l1[key] = (ttl, serialized_value)
             logging.debug(f"缓存设置: {key}, TTL: {ttl}s")
             return True
             
@@ -84,8 +171,45 @@ class CacheManager:
             logging.error(f"缓存设置失败 {key}: {e}")
             return False
     
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """批量获取缓存值（单次MGET往返）"""
+        try:
+            if not self.redis or not keys:
+                return [None] * len(keys)
+            
+            values = await self.redis.mget(keys)
+            return [_unpack(value) if value else None for value in values]
+            
+        except Exception as e:
+            logging.error(f"缓存批量获取失败 {keys}: {e}")
+            return [None] * len(keys)
+    
+    async def mset(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """批量设置缓存值（pipeline合并为单次往返）"""
+        try:
+            if not self.redis:
+                return False
+            if not items:
+                return True
+            
+            ttl = ttl or self.default_ttl
+            async with self.redis.pipeline(transaction=False) as pipe:
+                serialized = {key: _pack(value) for key, value in items.items()}
+                for key, serialized_value in serialized.items():
+                    pipe.setex(key, ttl, serialized_value)
+                await pipe.execute()
+            for key, serialized_value in serialized.items():
+                self._l1[key] = (ttl, serialized_value)
+            logging.debug(f"缓存批量设置: {len(items)} 项, TTL: {ttl}s")
+            return True
+            
+        except Exception as e:
+            logging.error(f"缓存批量设置失败: {e}")
+            return False
+    
     async def delete(self, key: str) -> bool:
         """删除缓存值"""
+        self._l1.pop(key, None)
         try:
             if not self.redis:
                 return False
@@ -139,8 +263,10 @@ def cache_result(ttl: int = 300, key_prefix: str = ""):
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # 生成缓存键
-            cache_key = f"{key_prefix}:{func.__name__}:{hash(str(args) + str(sorted(kwargs.items())))}"
+            # 生成缓存键 - 对序列化后的参数做稳定摘要，跨进程一致且不会因str()碰撞
+            key_payload = _dumps({"a": args, "k": sorted(kwargs.items())})
+            digest = hashlib.blake2b(key_payload, digest_size=16).hexdigest()
+            cache_key = f"{key_prefix}:{func.__module__}.{func.__name__}:{digest}"
             
             # 尝试从缓存获取
             cache_manager = getattr(wrapper, '_cache_manager', None)
@@ -181,15 +307,22 @@ class UsageDataCache:
         self.stats_ttl = 60     # 1分钟
         self.models_ttl = 3600   # 1小时
     
+    @staticmethod
+    def _filters_digest(filters: Dict[str, Any]) -> str:
+        """过滤条件规范化为有序元组后取blake2b摘要，跨进程稳定"""
+        canon = tuple(sorted(
+            (k, tuple(sorted(v, key=repr)) if isinstance(v, (list, set, tuple)) else v)
+            for k, v in filters.items()
+        ))
+        return hashlib.blake2b(repr(canon).encode(), digest_size=8).hexdigest()
+    
     def _get_usage_key(self, filters: Dict[str, Any], limit: int) -> str:
         """生成使用数据缓存键"""
-        filter_str = json.dumps(sorted(filters.items()))
-        return f"usage_data:{hash(filter_str)}:{limit}"
+        return f"usage_data:{self._filters_digest(filters)}:{limit}"
     
     def _get_stats_key(self, filters: Dict[str, Any]) -> str:
         """生成统计数据缓存键"""
-        filter_str = json.dumps(sorted(filters.items()))
-        return f"stats:{hash(filter_str)}"
+        return f"stats:{self._filters_digest(filters)}"
     
     def _get_models_key(self) -> str:
         """生成模型列表缓存键"""
@@ -225,6 +358,15 @@ class UsageDataCache:
         cache_key = self._get_models_key()
         return await self.cache_manager.set(cache_key, models, self.models_ttl)
     
+    async def get_dashboard(self, filters: Dict[str, Any], limit: int) -> Dict[str, Any]:
+        """一次MGET获取仪表盘所需的使用数据、统计和模型列表"""
+        usage_data, stats, models = await self.cache_manager.mget([
+            self._get_usage_key(filters, limit),
+            self._get_stats_key(filters),
+            self._get_models_key()
+        ])
+        return {"usage_data": usage_data, "stats": stats, "models": models}
+    
     async def invalidate_usage_cache(self):
         """失效使用数据相关的缓存"""
         patterns = [
@@ -232,12 +374,24 @@ class UsageDataCache:
             "stats:*"
         ]
         
+        self.cache_manager.clear_local()
+        
+        # SCAN增量遍历不会阻塞Redis，UNLINK在后台线程释放内存
+        batch_size = 500
+        redis_client = self.cache_manager.redis
         for pattern in patterns:
             try:
-                keys = await self.cache_manager.redis.keys(pattern)
-                if keys:
-                    await self.cache_manager.redis.delete(keys)
-                    logging.info(f"失效缓存模式: {pattern}, 删除了 {len(keys)} 个键")
+                deleted = 0
+                batch = []
+                async for key in redis_client.scan_iter(match=pattern, count=batch_size):
+                    batch.append(key)
+                    if len(batch) >= batch_size:
+                        deleted += await redis_client.unlink(*batch)
+                        batch.clear()
+                if batch:
+                    deleted += await redis_client.unlink(*batch)
+                if deleted:
+                    logging.info(f"失效缓存模式: {pattern}, 删除了 {deleted} 个键")
             except Exception as e:
                 logging.warning(f"失效缓存失败: {e}")
 
@@ -6,12 +6,59 @@
 
 import configparser
 import os
+import sys
 import logging
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Any, Tuple
 from dotenv import load_dotenv
 
 
+# 每1K tokens成本（只读，模块加载时构建一次；键名驻留，查找时可走指针比较）
+_COST_PER_1K: Mapping[str, float] = MappingProxyType({sys.intern(k): v for k, v in {
+    'claude-3-5-sonnet-20241022': 0.015,
+    'gpt-4o': 0.005,
+    'gpt-4o-mini': 0.00015,
+    'gemini-3-pro': 0.0025,
+    'gemini-2.5-pro': 0.00125,
+    'gemini-2.5-flash': 0.000075,
+    'gemini-2.0-flash': 0.00005,
+    'MiniMax-M2.1': 0.001,
+    'MiniMax-M2.1-lightning': 0.0005,
+    'glm-4': 0.001,
+    'glm-4-turbo': 0.0008,
+    'xiaomi-gpt-turbo': 0.0001,
+    'xiaomi-gpt': 0.0003,
+    'deepseek-chat': 0.00014
+}.items()})
+
+
+@dataclass(frozen=True)
+class Settings:
+    """启动时解析一次的只读配置快照，热路径直接读属性"""
+    # 手写__slots__以兼容Python 3.8（dataclass的slots参数需3.10+）
+    __slots__ = (
+        'db_path', 'log_file', 'paid_providers', 'paid_models', 'paid_models_lower',
+        'paid_model_set', 'paid_providers_set', 'cost_per_1k',
+        'redis_host', 'redis_port', 'redis_db', 'redis_password',
+    )
+    
+    db_path: str
+    log_file: str
+    paid_providers: Tuple[str, ...]
+    paid_models: Tuple[str, ...]
+    paid_models_lower: Tuple[str, ...]
+    paid_model_set: FrozenSet[str]
+    paid_providers_set: FrozenSet[str]
+    cost_per_1k: Mapping[str, float]
+    redis_host: str
+    redis_port: int
+    redis_db: int
+    redis_password: str
+
+
 class ConfigManager:
     """配置管理器 - 提供统一的配置接口"""
     
@@ -21,6 +68,7 @@ class ConfigManager:
         
         self.config_file = config_file or self._get_default_config_path()
         self.config = configparser.ConfigParser()
+        self._resolved: Dict[Tuple[str, str], str] = {}
         self._load_config()
     
     def _load_env(self):
@@ -54,6 +102,38 @@ class ConfigManager:
         except Exception as e:
             logging.error(f"配置文件加载失败: {e}")
             raise ConfigError(f"Failed to load config: {e}")
+        self._resolve_values()
+        self.settings = self._build_settings()
+    
+    def _build_settings(self) -> Settings:
+        """由已解析的配置构建只读Settings"""
+        script_dir = Path(__file__).parent
+        paid_providers = tuple(self.get_list('models', 'paid_providers', ['anthropic', 'openai', 'cohere']))
+        paid_models = tuple(self.get_list('models', 'paid_models', ['gemini-3-pro']))
+        paid_models_lower = tuple(m.lower() for m in paid_models)
+        return Settings(
+            db_path=str(script_dir / (self.get('database', 'path') or 'token_usage.db')),
+            log_file=str(script_dir / (self.get('logging', 'file') or 'token_monitor.log')),
+            paid_providers=paid_providers,
+            paid_models=paid_models,
+            paid_models_lower=paid_models_lower,
+            paid_model_set=frozenset(paid_models_lower),
+            paid_providers_set=frozenset(paid_providers),
+            cost_per_1k=_COST_PER_1K,
+            redis_host=self.get('cache', 'redis_host', 'localhost'),
+            redis_port=self.get_int('cache', 'redis_port', 6379),
+            redis_db=self.get_int('cache', 'redis_db', 0),
+            redis_password=self.get('cache', 'redis_password', ''),
+        )
+    
+    def _resolve_values(self):
+        """预先解析所有配置项（环境变量覆盖配置文件），避免每次get重复查找"""
+        resolved = {}
+        for section in self.config.sections():
+            for key, value in self.config.items(section):
+                env_value = os.getenv(f"{section.upper()}_{key.upper()}")
+                resolved[(section, key)] = env_value if env_value is not None else value
+        self._resolved = resolved
     
     def _create_default_config(self):
         """创建默认配置"""
@@ -106,6 +186,11 @@ cleanup_interval_hours = 24
     
     def get(self, section: str, key: str, fallback: Any = None) -> Optional[str]:
         """获取配置值 - 优先级：环境变量 > 配置文件 > 默认值"""
+        value = self._resolved.get((section, key))
+        if value is not None:
+            return value
+        
+        # 配置文件中不存在的键仍允许由环境变量提供
         env_key = f"{section.upper()}_{key.upper()}"
         env_value = os.getenv(env_key)
         if env_value is not None:
@@ -154,26 +239,22 @@ cleanup_interval_hours = 24
     @property
     def db_path(self) -> str:
         """获取数据库路径"""
-        db_name = self.get('database', 'path') or 'token_usage.db'
-        script_dir = Path(__file__).parent
-        return str(script_dir / db_name)
+        return self.settings.db_path
     
     @property
     def log_file(self) -> str:
         """获取日志文件路径"""
-        log_name = self.get('logging', 'file') or 'token_monitor.log'
-        script_dir = Path(__file__).parent
-        return str(script_dir / log_name)
+        return self.settings.log_file
     
-    @property
+    @cached_property
     def paid_providers(self) -> List[str]:
         """付费提供商列表"""
-        return self.get_list('models', 'paid_providers', ['anthropic', 'openai', 'cohere'])
+        return list(self.settings.paid_providers)
     
-    @property
+    @cached_property
     def paid_models(self) -> List[str]:
         """付费模型列表"""
-        return self.get_list('models', 'paid_models', ['gemini-3-pro'])
+        return list(self.settings.paid_models)
     
     @property
     def google_paid_api_key(self) -> str:
@@ -187,39 +268,31 @@ cleanup_interval_hours = 24
     
     def is_paid_model(self, provider: str, model_name: str) -> bool:
         """判断是否为付费模型 - 更新为精确匹配"""
-        # Google API的付费模型判断
-        if provider == 'google' and 'gemini-3-pro' in model_name.lower():
+        settings = self.settings
+        return self._is_paid_cached(
+            provider, model_name.lower(),
+            settings.paid_model_set, settings.paid_providers_set, settings.paid_models_lower
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=2048)
+    def _is_paid_cached(provider: str, model_lower: str, paid_model_set: FrozenSet[str],
+                        paid_providers_set: FrozenSet[str], paid_models_lower: Tuple[str, ...]) -> bool:
+        """付费判断的记忆化实现，配置集合作为缓存键的一部分，配置变化后旧结果自然失效"""
+        # 精确匹配与付费提供商均为单次哈希查找
+        if model_lower in paid_model_set or provider in paid_providers_set:
             return True
         
-        # 其他付费提供商
-        if provider in self.paid_providers:
+        # Google API的付费模型判断
+        if provider == 'google' and 'gemini-3-pro' in model_lower:
             return True
         
-        # 特定付费模型
-        for paid_model in self.paid_models:
-            if paid_model.lower() in model_name.lower():
-                return True
-        
-        return False
+        # 带版本后缀等变体仍按子串匹配
+        return any(paid_model in model_lower for paid_model in paid_models_lower)
     
-    def get_cost_per_1k(self) -> Dict[str, float]:
-        """获取每1K tokens的成本"""
-        return {
-            'claude-3-5-sonnet-20241022': 0.015,
-            'gpt-4o': 0.005,
-            'gpt-4o-mini': 0.00015,
-            'gemini-3-pro': 0.0025,
-            'gemini-2.5-pro': 0.00125,
-            'gemini-2.5-flash': 0.000075,
-            'gemini-2.0-flash': 0.00005,
-            'MiniMax-M2.1': 0.001,
-            'MiniMax-M2.1-lightning': 0.0005,
-            'glm-4': 0.001,
-            'glm-4-turbo': 0.0008,
-            'xiaomi-gpt-turbo': 0.0001,
-            'xiaomi-gpt': 0.0003,
-            'deepseek-chat': 0.00014
-        }
+    def get_cost_per_1k(self) -> Mapping[str, float]:
+        """获取每1K tokens的成本（只读映射）"""
+        return self.settings.cost_per_1k
     
     @property
     def db_host(self) -> str:
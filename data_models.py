@@ -4,13 +4,103 @@
 统一数据结构，确保前后端一致性
 """
 
-from dataclasses import dataclass, asdict
-from datetime import datetime
-from typing import Optional, Dict, Any
-import json
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from itertools import islice
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, List, Sequence, Tuple
+import atexit
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
 
 
-@dataclass
+# ISO-8601解析: 优先ciso8601（C实现），否则使用标准库（3.11起原生支持'Z'后缀）
+try:
+    from ciso8601 import parse_datetime as _parse_datetime
+except ImportError:
+    if sys.version_info >= (3, 11):
+        _parse_datetime = datetime.fromisoformat
+    else:
+        def _parse_datetime(value: str) -> datetime:
+            if value.endswith('Z'):
+                value = value[:-1] + '+00:00'
+            return datetime.fromisoformat(value)
+
+# Python 3.10+ 使用slots数据类，减少实例内存并加快属性访问（3.8/3.9回退为普通数据类）
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# 校验用常量
+_REQUIRED_FIELDS = ('model_name', 'model_type', 'tokens_used', 'cost')
+_VALID_MODEL_TYPES = frozenset({'paid', 'free'})
+_VALID_STATUSES = frozenset({'success', 'error', 'timeout'})
+
+# 插入语句（单条与批量共用）
+INSERT_SQL = '''
+    INSERT INTO token_usage 
+    (timestamp, model_name, model_type, tokens_used, cost, response_time, status, 
+     api_provider, request_type, user_id, session_id, agent_name, category)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# 批量插入的分批大小，超过后收益递减
+INSERT_BATCH_SIZE = 10000
+
+# timeRange对应的回溯天数（day为当天0点起）
+TIME_RANGE_DAYS = {'day': 0, 'week': 7, 'month': 30, 'year': 365}
+
+# 查询列顺序与TokenUsage字段一一对应，行数据按位置构造对象
+SELECT_COLUMNS = (
+    "id, timestamp, model_name, model_type, tokens_used, cost, response_time, status, "
+    "api_provider, request_type, user_id, session_id, agent_name, category"
+)
+COLUMN_NAMES = tuple(name.strip() for name in SELECT_COLUMNS.split(','))
+# 非空数值列在按列查询时存为array.array
+COLUMN_TYPECODES = {'id': 'q', 'timestamp': 'q', 'tokens_used': 'q', 'cost': 'd'}
+STATS_SQL = '''
+    SELECT COALESCE(SUM(tokens_used), 0), COALESCE(SUM(cost), 0), COUNT(*)
+    FROM token_usage WHERE {where_clause}
+'''
+SELECT_SQL = f'''
+    SELECT {SELECT_COLUMNS} FROM token_usage 
+    WHERE {{where_clause}}
+    ORDER BY timestamp DESC
+    LIMIT ?
+'''
+
+# 连接级PRAGMA: WAL读写互不阻塞，NORMAL同步减少fsync
+SQLITE_PRAGMAS = '''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-20000;
+'''
+
+
+def _day_start(day: date) -> int:
+    """某天本地0点的Unix秒"""
+    return int(datetime.combine(day, dt_time()).timestamp())
+
+
+def _percent_change(current: float, previous: float) -> float:
+    """环比变化百分比，上一周期为0时返回0"""
+    return round((current - previous) / previous * 100, 1) if previous else 0.0
+
+
+@lru_cache(maxsize=64)
+def _usage_query(where_conditions: Tuple[str, ...]) -> str:
+    """按过滤条件组合缓存查询SQL，相同组合复用同一语句文本，命中sqlite3语句缓存"""
+    where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
+    return SELECT_SQL.format(where_clause=where_clause)
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class TokenUsage:
     """Token使用记录数据模型"""
     id: Optional[int] = None
@@ -29,68 +119,67 @@ class TokenUsage:
     category: Optional[str] = None
 
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典，保持向后兼容"""
-        result = asdict(self)
-        
-        # 时间戳格式化
-        if isinstance(result['timestamp'], datetime):
-            result['timestamp'] = result['timestamp'].isoformat()
-        
-        # 前端兼容字段映射
-        frontend_mapping = {
-            'model': result['model_name'],
-            'tokens': result['tokens_used'],
-            'responseTime': result['response_time'],
-            'apiProvider': result['api_provider'],
-            'requestType': result['request_type']
+        """转换为字典，保持向后兼容（同时包含前端兼容字段）"""
+        timestamp = self.timestamp
+        return {
+            'id': self.id,
+            'timestamp': timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+            'model_name': self.model_name,
+            'model_type': self.model_type,
+            'tokens_used': self.tokens_used,
+            'cost': self.cost,
+            'response_time': self.response_time,
+            'status': self.status,
+            'api_provider': self.api_provider,
+            'request_type': self.request_type,
+            'user_id': self.user_id,
+            'session_id': self.session_id,
+            'agent_name': self.agent_name,
+            'category': self.category,
+            # 前端兼容字段
+            'model': self.model_name,
+            'tokens': self.tokens_used,
+            'responseTime': self.response_time,
+            'apiProvider': self.api_provider,
+            'requestType': self.request_type
         }
-        
-        # 只添加不存在的字段，避免覆盖
-        for key, value in frontend_mapping.items():
-            if key not in result:
-                result[key] = value
-        
-        return result
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'TokenUsage':
         """从字典创建实例"""
-        # 处理时间戳
-        timestamp = data.get('timestamp')
-        if isinstance(timestamp, str):
+        get = data.get
+        
+        # 处理时间戳 - 空值直接取当前时间，不经过解析异常路径
+        # （fromisoformat/ciso8601均接受空格分隔的数据库格式，无需替换为'T'）
+        timestamp = get('timestamp')
+        if not timestamp:
+            timestamp = datetime.now()
+        elif isinstance(timestamp, str):
             try:
-                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                timestamp = _parse_datetime(timestamp)
             except ValueError:
                 timestamp = datetime.now()
-        elif timestamp is None:
-            timestamp = datetime.now()
-        
-        # 处理前端字段映射
-        model_name = data.get('model_name') or data.get('model', '')
-        tokens_used = data.get('tokens_used') or data.get('tokens', 0)
-        response_time = data.get('response_time') or data.get('responseTime')
-        api_provider = data.get('api_provider') or data.get('apiProvider')
-        request_type = data.get('request_type') or data.get('requestType')
         
+        # 按字段顺序位置构造，兼容前端字段名
         return cls(
-            id=data.get('id'),
-            timestamp=timestamp,
-            model_name=model_name,
-            model_type=data.get('model_type', ''),
-            tokens_used=tokens_used,
-            cost=float(data.get('cost', 0.0)),
-            response_time=response_time,
-            status=data.get('status', 'success'),
-            api_provider=api_provider,
-            request_type=request_type,
-            user_id=data.get('user_id', 'default'),
-            session_id=data.get('session_id'),
-            agent_name=data.get('agent_name'),
-            category=data.get('category')
+            get('id'),
+            timestamp,
+            get('model_name') or get('model', ''),
+            get('model_type', ''),
+            get('tokens_used') or get('tokens', 0),
+            float(get('cost', 0.0)),
+            get('response_time') or get('responseTime'),
+            get('status', 'success'),
+            get('api_provider') or get('apiProvider'),
+            get('request_type') or get('requestType'),
+            get('user_id', 'default'),
+            get('session_id'),
+            get('agent_name'),
+            get('category')
         )
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ModelInfo:
     """模型信息数据模型"""
     name: str
@@ -99,10 +188,15 @@ class ModelInfo:
     description: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {
+            'name': self.name,
+            'type': self.type,
+            'provider': self.provider,
+            'description': self.description
+        }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class UsageStats:
     """使用统计数据模型"""
     total_tokens: int = 0
@@ -115,7 +209,16 @@ class UsageStats:
     avg_tokens_change: float = 0.0
     
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {
+            'total_tokens': self.total_tokens,
+            'total_cost': self.total_cost,
+            'total_calls': self.total_calls,
+            'avg_tokens': self.avg_tokens,
+            'tokens_change': self.tokens_change,
+            'cost_change': self.cost_change,
+            'calls_change': self.calls_change,
+            'avg_tokens_change': self.avg_tokens_change
+        }
 
 
 class DataValidationError(Exception):
@@ -129,35 +232,31 @@ class TokenUsageValidator:
     @staticmethod
     def validate_token_usage(data: Dict[str, Any]) -> TokenUsage:
         """验证并创建TokenUsage实例"""
+        # 必需字段检查
+        for field in _REQUIRED_FIELDS:
+            if field not in data:
+                raise DataValidationError(f"Missing required field: {field}")
+        
+        # 数据类型和范围验证
+        tokens_used = data.get('tokens_used') or data.get('tokens', 0)
+        if not isinstance(tokens_used, int) or tokens_used < 0:
+            raise DataValidationError("tokens_used must be a non-negative integer")
+        
+        cost = data.get('cost', 0.0)
+        if not isinstance(cost, (int, float)) or cost < 0:
+            raise DataValidationError("cost must be a non-negative number")
+        
+        model_type = data.get('model_type', '')
+        if not isinstance(model_type, str) or model_type not in _VALID_MODEL_TYPES:
+            raise DataValidationError("model_type must be 'paid' or 'free'")
+        
+        status = data.get('status', 'success')
+        if not isinstance(status, str) or status not in _VALID_STATUSES:
+            raise DataValidationError("status must be valid status value")
+        
         try:
-            # 必需字段检查
-            required_fields = ['model_name', 'model_type', 'tokens_used', 'cost']
-            for field in required_fields:
-                if field not in data and field not in ['model', 'tokens']:
-                    raise DataValidationError(f"Missing required field: {field}")
-            
-            # 数据类型和范围验证
-            tokens_used = data.get('tokens_used') or data.get('tokens', 0)
-            if not isinstance(tokens_used, int) or tokens_used < 0:
-                raise DataValidationError("tokens_used must be a non-negative integer")
-            
-            cost = data.get('cost', 0.0)
-            if not isinstance(cost, (int, float)) or cost < 0:
-                raise DataValidationError("cost must be a non-negative number")
-            
-            model_type = data.get('model_type', '')
-            if model_type not in ['paid', 'free']:
-                raise DataValidationError("model_type must be 'paid' or 'free'")
-            
-            status = data.get('status', 'success')
-            if status not in ['success', 'error', 'timeout']:
-                raise DataValidationError("status must be valid status value")
-            
             return TokenUsage.from_dict(data)
-            
-        except Exception as e:
-            if isinstance(e, DataValidationError):
-                raise
+        except (TypeError, ValueError) as e:
             raise DataValidationError(f"Data validation failed: {e}")
 
 
@@ -167,19 +266,56 @@ class DatabaseManager:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self._init_database()
+        # 写操作共用一个长连接（加锁串行），读操作使用线程本地连接，借助WAL并发读
+        self._conn = self._connect()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+        atexit.register(self.close)
+    
+    def _connect(self, read_only: bool = False):
+        """创建自动提交模式的连接并应用PRAGMA，read_only时以mode=ro打开"""
+        if read_only:
+            target, uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro", True
+        else:
+            target, uri = self.db_path, False
+        conn = sqlite3.connect(
+            target, uri=uri, check_same_thread=False, isolation_level=None, cached_statements=256
+        )
+        conn.executescript(SQLITE_PRAGMAS)
+        return conn
+    
+    def _reader(self):
+        """获取当前线程的只读连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect(read_only=True)
+        return conn
+    
+    def close(self):
+        """关闭写连接和当前线程的读连接，关闭前执行PRAGMA optimize更新查询统计"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._conn.execute("PRAGMA optimize")
+        except sqlite3.Error as e:
+            logging.warning(f"PRAGMA optimize失败: {e}")
+        self._conn.close()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
     
     def _init_database(self):
         """初始化数据库表"""
-        import sqlite3
-        import os
-        
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
         
         with sqlite3.connect(self.db_path) as conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS token_usage (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    timestamp INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
                     model_name TEXT NOT NULL,
                     model_type TEXT NOT NULL,
                     tokens_used INTEGER NOT NULL,
@@ -208,20 +344,31 @@ class DatabaseManager:
             ''')
             
             # 创建性能优化索引
+            # 仅按时间范围查询走timestamp索引；按模型类型+时间范围查询走(model_type, timestamp)复合索引
             conn.execute('''
                 CREATE INDEX IF NOT EXISTS idx_token_usage_timestamp 
                 ON token_usage(timestamp DESC)
             ''')
             
+            # 末尾附带tokens_used/cost，统计聚合可直接在索引上完成（覆盖索引）
             conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_token_usage_model_type 
-                ON token_usage(model_type)
+                CREATE INDEX IF NOT EXISTS idx_token_usage_type_timestamp_cover 
+                ON token_usage(model_type, timestamp DESC, tokens_used, cost)
             ''')
             
-            conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_token_usage_timestamp_model 
-                ON token_usage(timestamp DESC, model_type)
-            ''')
+            # 旧索引已被上面两个索引覆盖，只会拖慢写入
+            conn.execute('DROP INDEX IF EXISTS idx_token_usage_model_type')
+            conn.execute('DROP INDEX IF EXISTS idx_token_usage_timestamp_model')
+            conn.execute('DROP INDEX IF EXISTS idx_token_usage_type_timestamp')
+            
+            # 一次性迁移: 旧库的timestamp为UTC文本，转换为Unix秒（DATETIME列为NUMERIC亲和性，可直接存整数）
+            if conn.execute('PRAGMA user_version').fetchone()[0] < 1:
+                conn.execute('''
+                    UPDATE token_usage
+                    SET timestamp = CAST(strftime('%s', timestamp) AS INTEGER)
+                    WHERE typeof(timestamp) = 'text'
+                ''')
+                conn.execute('PRAGMA user_version = 1')
             
             conn.execute('''
                 CREATE INDEX IF NOT EXISTS idx_token_usage_provider_model 
@@ -233,109 +380,258 @@ class DatabaseManager:
                 ON token_usage(user_id, session_id)
             ''')
             
+            self._model_fts = self._init_model_fts(conn)
+            
+            # 首次初始化时收集统计信息，供查询规划器选择索引
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+                conn.execute("ANALYZE")
             conn.commit()
     
+    @staticmethod
+    def _init_model_fts(conn) -> bool:
+        """创建model_name的FTS5 trigram影子索引，支持子串过滤走索引
+        
+        需要SQLite 3.34+ 且启用FTS5，不可用时返回False，查询回退为LIKE全表扫描
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'token_usage_model_fts'"
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            conn.execute('''
+                CREATE VIRTUAL TABLE token_usage_model_fts USING fts5(
+                    model_name, content='token_usage', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logging.warning(f"FTS5 trigram不可用，模型过滤使用LIKE: {e}")
+            return False
+        
+        # 触发器保持影子索引与主表同步
+        conn.executescript('''
+            CREATE TRIGGER IF NOT EXISTS token_usage_model_fts_ai AFTER INSERT ON token_usage BEGIN
+                INSERT INTO token_usage_model_fts(rowid, model_name) VALUES (new.id, new.model_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS token_usage_model_fts_ad AFTER DELETE ON token_usage BEGIN
+                INSERT INTO token_usage_model_fts(token_usage_model_fts, rowid, model_name)
+                VALUES ('delete', old.id, old.model_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS token_usage_model_fts_au AFTER UPDATE OF model_name ON token_usage BEGIN
+                INSERT INTO token_usage_model_fts(token_usage_model_fts, rowid, model_name)
+                VALUES ('delete', old.id, old.model_name);
+                INSERT INTO token_usage_model_fts(rowid, model_name) VALUES (new.id, new.model_name);
+            END;
+        ''')
+        conn.execute("INSERT INTO token_usage_model_fts(token_usage_model_fts) VALUES ('rebuild')")
+        return True
+    
     def insert_token_usage(self, token_usage: TokenUsage) -> bool:
         """插入Token使用记录"""
         try:
-            import sqlite3
-            
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('''
-                    INSERT INTO token_usage 
-                    (model_name, model_type, tokens_used, cost, response_time, status, 
-                     api_provider, request_type, user_id, session_id, agent_name, category)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    token_usage.model_name,
-                    token_usage.model_type,
-                    token_usage.tokens_used,
-                    token_usage.cost,
-                    token_usage.response_time,
-                    token_usage.status,
-                    token_usage.api_provider,
-                    token_usage.request_type,
-                    token_usage.user_id,
-                    token_usage.session_id,
-                    token_usage.agent_name,
-                    token_usage.category
-                ))
-                conn.commit()
+            with self._write_lock:
+                self._conn.execute(INSERT_SQL, self._insert_params(token_usage))
             return True
         except Exception as e:
-            import logging
             logging.error(f"插入数据失败: {e}")
             return False
     
-    def get_usage_data(self, filters: Optional[Dict[str, Any]] = None, limit: int = 100) -> list[TokenUsage]:
-        """获取使用数据"""
+    def insert_token_usage_many(self, records: Iterable[TokenUsage]) -> int:
+        """批量插入Token使用记录 - 单连接单事务executemany，返回插入条数"""
         try:
-            import sqlite3
+            inserted = 0
+            records = iter(records)
+            with self._write_lock:
+                conn = self._conn
+                # IMMEDIATE在事务开始时即取得写锁，避免中途锁升级失败
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    while True:
+                        params = [self._insert_params(t) for t in islice(records, INSERT_BATCH_SIZE)]
+                        if not params:
+                            break
+                        conn.executemany(INSERT_SQL, params)
+                        inserted += len(params)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                # 大批量导入后数据分布可能明显变化，重新收集统计信息
+                if inserted >= INSERT_BATCH_SIZE:
+                    conn.execute("ANALYZE token_usage")
+            return inserted
+        except Exception as e:
+            logging.error(f"批量插入数据失败: {e}")
+            return 0
+    
+    def insert_validated_stream(self, records: Iterable[Dict[str, Any]]) -> int:
+        """校验并流式插入原始字典记录 - 生成器直接交给executemany惰性消费，单事务提交
+        
+        任一记录校验失败时整批回滚并抛出DataValidationError
+        """
+        validate = TokenUsageValidator.validate_token_usage
+        insert_params = self._insert_params
+        params = (insert_params(validate(data)) for data in records)
+        
+        with self._write_lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = conn.executemany(INSERT_SQL, params).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return inserted
+    
+    @staticmethod
+    def _insert_params(t: TokenUsage) -> tuple:
+        """TokenUsage转为INSERT_SQL参数"""
+        timestamp = int(t.timestamp.timestamp()) if t.timestamp else int(time.time())
+        return (
+            timestamp, t.model_name, t.model_type, t.tokens_used, t.cost, t.response_time, t.status,
+            t.api_provider, t.request_type, t.user_id, t.session_id, t.agent_name, t.category
+        )
+    
+    @staticmethod
+    def _row_to_token_usage(row: tuple) -> TokenUsage:
+        """SELECT_COLUMNS顺序的行转为TokenUsage"""
+        timestamp = datetime.fromtimestamp(row[1]) if row[1] is not None else datetime.now()
+        return TokenUsage(
+            row[0], timestamp, row[2], row[3], row[4], row[5], row[6],
+            row[7], row[8], row[9], row[10], row[11], row[12], row[13]
+        )
+    
+    def _build_usage_where(self, filters: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, ...], list]:
+        """根据过滤条件生成WHERE片段和参数"""
+        where_conditions = []
+        params = []
+        
+        if filters is not None:
+            # 时间范围过滤
+            # 边界在Python中算好（本地时间0点的Unix秒），直接比较timestamp列以便走索引范围扫描
+            days = TIME_RANGE_DAYS.get(filters.get('timeRange', 'week'))
+            if days is not None:
+                where_conditions.append("timestamp >= ?")
+                params.append(_day_start(date.today() - timedelta(days=days)))
             
-            where_conditions = []
-            params = []
+            # 模型类型过滤
+            model_type = filters.get('modelType')
+            if model_type and model_type != 'all':
+                where_conditions.append("model_type = ?")
+                params.append(model_type)
             
-            if filters is not None:
-                # 时间范围过滤
-                time_range = filters.get('timeRange', 'week')
-                if time_range == 'day':
-                    where_conditions.append("DATE(timestamp) = DATE('now')")
-                elif time_range == 'week':
-                    where_conditions.append("DATE(timestamp) >= DATE('now', '-7 days')")
-                elif time_range == 'month':
-                    where_conditions.append("DATE(timestamp) >= DATE('now', '-30 days')")
-                elif time_range == 'year':
-                    where_conditions.append("DATE(timestamp) >= DATE('now', '-365 days')")
-                
-                # 模型类型过滤
-                model_type = filters.get('modelType')
-                if model_type and model_type != 'all':
-                    where_conditions.append("model_type = ?")
-                    params.append(model_type)
-                
-                # 具体模型过滤
-                specific_model = filters.get('specificModel')
-                if specific_model and specific_model != 'all':
+            # 具体模型过滤
+            specific_model = filters.get('specificModel')
+            if specific_model and specific_model != 'all':
+                # trigram索引至少需要3个字符，更短的关键字仍用LIKE
+                if self._model_fts and len(specific_model) >= 3:
+                    where_conditions.append(
+                        "id IN (SELECT rowid FROM token_usage_model_fts WHERE model_name LIKE ?)"
+                    )
+                else:
                     where_conditions.append("model_name LIKE ?")
-                    params.append(f"%{specific_model}%")
-                
-                # 日期范围过滤
-                start_date = filters.get('startDate')
-                if start_date:
-                    where_conditions.append("DATE(timestamp) >= ?")
-                    params.append(start_date)
-                
-                end_date = filters.get('endDate')
-                if end_date:
-                    where_conditions.append("DATE(timestamp) <= ?")
-                    params.append(end_date)
+                params.append(f"%{specific_model}%")
             
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
+            # 日期范围过滤
+            start_date = filters.get('startDate')
+            if start_date:
+                where_conditions.append("timestamp >= ?")
+                params.append(_day_start(date.fromisoformat(start_date)))
+            
+            end_date = filters.get('endDate')
+            if end_date:
+                where_conditions.append("timestamp < ?")
+                params.append(_day_start(date.fromisoformat(end_date) + timedelta(days=1)))
+        
+        return tuple(where_conditions), params
+    
+    def get_usage_data(self, filters: Optional[Dict[str, Any]] = None, limit: int = 100) -> List[TokenUsage]:
+        """获取使用数据"""
+        try:
+            where_conditions, params = self._build_usage_where(filters)
             params.append(limit)
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                query = '''
-                    SELECT * FROM token_usage 
-                    WHERE {where_clause}
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                '''
-                
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-                
-                # 转换为TokenUsage对象
-                columns = [description[0] for description in cursor.description]
-                results = []
+            query = _usage_query(where_conditions)
+            rows = self._reader().execute(query, params).fetchall()
+            
+            # 按列位置直接构造TokenUsage，数据库行不需要from_dict的字段别名处理
+            return [self._row_to_token_usage(row) for row in rows]
                 
-                for row in rows:
-                    row_dict = dict(zip(columns, row))
-                    results.append(TokenUsage.from_dict(row_dict))
+        except Exception as e:
+            logging.error(f"查询数据失败: {e}")
+            return []
+    
+    def get_usage_columns(self, filters: Optional[Dict[str, Any]] = None, limit: int = 100) -> Dict[str, Sequence]:
+        """按列获取使用数据 - 供聚合统计使用，不构造逐行TokenUsage对象
+        
+        数值列为连续内存的array.array，其余列为tuple，均按SELECT_COLUMNS顺序命名
+        """
+        try:
+            where_conditions, params = self._build_usage_where(filters)
+            params.append(limit)
+            
+            rows = self._reader().execute(_usage_query(where_conditions), params).fetchall()
+            columns = list(zip(*rows)) if rows else [()] * len(COLUMN_NAMES)
+            return {
+                name: array(COLUMN_TYPECODES[name], values) if name in COLUMN_TYPECODES else values
+                for name, values in zip(COLUMN_NAMES, columns)
+            }
                 
-                return results
+        except Exception as e:
+            logging.error(f"按列查询数据失败: {e}")
+            return {name: () for name in COLUMN_NAMES}
+    
+    def get_usage_stats(self, filters: Optional[Dict[str, Any]] = None) -> UsageStats:
+        """在SQL中聚合统计当前周期，并与等长的上一周期对比计算变化率"""
+        try:
+            filters = filters or {}
+            tokens, cost, calls = self._aggregate(filters)
+            stats = UsageStats(
+                total_tokens=tokens,
+                total_cost=round(cost, 4),
+                total_calls=calls,
+                avg_tokens=tokens // calls if calls else 0
+            )
+            
+            previous_filters = self._previous_period_filters(filters)
+            if previous_filters is not None:
+                prev_tokens, prev_cost, prev_calls = self._aggregate(previous_filters)
+                prev_avg = prev_tokens // prev_calls if prev_calls else 0
+                stats.tokens_change = _percent_change(tokens, prev_tokens)
+                stats.cost_change = _percent_change(cost, prev_cost)
+                stats.calls_change = _percent_change(calls, prev_calls)
+                stats.avg_tokens_change = _percent_change(stats.avg_tokens, prev_avg)
+            return stats
                 
         except Exception as e:
-            import logging
-            logging.error(f"查询数据失败: {e}")
-            return []
\ No newline at end of file
+            logging.error(f"统计数据失败: {e}")
+            return UsageStats()
+    
+    def _aggregate(self, filters: Dict[str, Any]) -> Tuple[int, float, int]:
+        """单条SQL聚合 (总tokens, 总成本, 调用次数)"""
+        where_conditions, params = self._build_usage_where(filters)
+        where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
+        return self._reader().execute(STATS_SQL.format(where_clause=where_clause), params).fetchone()
+    
+    @staticmethod
+    def _previous_period_filters(filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """构造上一周期的过滤条件（按自然日对齐），无时间范围时返回None"""
+        today = date.today()
+        start_date = filters.get('startDate')
+        if start_date:
+            start = date.fromisoformat(start_date)
+            end_date = filters.get('endDate')
+            end = date.fromisoformat(end_date) if end_date else today
+        else:
+            days = TIME_RANGE_DAYS.get(filters.get('timeRange', 'week'))
+            if days is None:
+                return None
+            start, end = today - timedelta(days=days), today
+        
+        span = (end - start).days + 1
+        previous = dict(filters)
+        previous['timeRange'] = 'all'
+        previous['startDate'] = (start - timedelta(days=span)).isoformat()
+        previous['endDate'] = (start - timedelta(days=1)).isoformat()
+        return previous
@@ -5,18 +5,23 @@
 """
 
 import os
+import re
 import sys
+import json
+import hashlib
+import importlib.util
 import logging
 import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Request, WebSocket, WebSocketDisconnect, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel, Field
 from slowapi import Limiter
@@ -35,15 +40,61 @@ from audit_logger import audit_logger, generate_request_id
 # 导入优化的数据生成器
 from optimized_data_generator import DataGenerator
 from redis_cache import cache_manager, CACHE_TTL
+from usage_store import UsageRow, UsageStore
+
+try:
+    import orjson
+
+    def _json_text(obj) -> str:
+        return orjson.dumps(obj, default=str).decode()
+except ImportError:
+    orjson = None
+
+    def _json_text(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+# JSON响应默认使用orjson编码，未安装时回退到标准JSONResponse
+DefaultJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
 
 # 创建数据生成器实例
 data_generator = DataGenerator()
 
+# 启动时生成的历史数据天数
+SEED_HISTORY_DAYS = 30
+
+# 历史数据生成任务，完成前健康检查报告 warming
+_seed_task: Optional[asyncio.Task] = None
+
+async def _seed_historical_data():
+    """在线程池中生成历史数据，完成后并入存储并预热统计缓存"""
+    loop = asyncio.get_running_loop()
+    try:
+        records = await loop.run_in_executor(None, data_generator.generate_historical_rows, SEED_HISTORY_DAYS)
+    except Exception as e:
+        logger.error(f"生成历史数据失败: {e}")
+        return
+    usage_data.extend(records)
+    usage_store.reset(usage_data)
+    logger.info(f"已生成 {len(records)} 条历史数据")
+    # 预热期间按空数据计算并缓存的统计结果一并失效
+    cache_manager.clear_pattern("stats:*")
+    warm_stats_cache()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：历史数据在后台生成，服务启动后立即可以响应请求"""
+    global _seed_task
+    _seed_task = asyncio.create_task(_seed_historical_data())
+    yield
+    _seed_task.cancel()
+
 # 应用配置
 app = FastAPI(
     title="Token Monitor Enterprise API",
     description="企业级Token使用监控系统 - 优化版",
     version="2.0.0",
+    default_response_class=DefaultJSONResponse,
+    lifespan=lifespan,
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_tags=[
@@ -146,8 +197,8 @@ class UsageQueryParams(BaseModel):
     offset: Optional[int] = Field(0, ge=0, description="偏移量")
 
 # 模型常量
-FREE_MODELS = ["gemini-2.5-pro", "gemini-2.5-flash", "gemini-2.0-flash"]
-PAID_MODELS = ["gemini-3-pro"]
+FREE_MODELS = frozenset({"gemini-2.5-pro", "gemini-2.5-flash", "gemini-2.0-flash"})
+PAID_MODELS = frozenset({"gemini-3-pro"})
 
 # 响应模型
 class UsageResponse(BaseModel):
@@ -165,28 +216,57 @@ class StatsResponse(BaseModel):
     success_rate: float = Field(..., description="成功率")
     date_range: str = Field(..., description="数据时间范围")
 
-# 内存存储
-usage_data: List[Dict[str, Any]] = []
+# 内存存储（记录为 UsageRow，usage_store 为其列式索引）
+usage_data: List[UsageRow] = []
+usage_store = UsageStore(usage_data)
 
 # WebSocket连接管理器
 class ConnectionManager:
+    # 单个连接积压的待发送消息上限，超过视为失效连接
+    QUEUE_SIZE = 256
+
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        self._queues: Dict[WebSocket, asyncio.Queue] = {}
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
     
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.append(websocket)
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self._queues[websocket] = queue
+        self._writers[websocket] = asyncio.create_task(self._writer(websocket, queue))
     
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        self._queues.pop(websocket, None)
+        writer = self._writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+    
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """连接写协程：每次取空积压的消息后连续发送"""
+        try:
+            while True:
+                batch = [await queue.get()]
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                for payload in batch:
+                    await websocket.send_text(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(websocket)
     
     async def broadcast(self, message: dict):
-        for connection in list(self.active_connections):
+        """消息只序列化一次，投递到各连接的发送队列，不等待慢客户端"""
+        payload = _json_text(message)
+        for connection, queue in list(self._queues.items()):
             try:
-                await connection.send_json(message)
-            except Exception:
-                self.active_connections.remove(connection)
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self.disconnect(connection)
 
 ws_manager = ConnectionManager()
 
@@ -200,13 +280,14 @@ class SensitiveDataFilter(logging.Filter):
     """日志敏感信息过滤器"""
     
     SENSITIVE_KEYS = {'password', 'token', 'api_key', 'secret', 'authorization', 'x-api-key'}
+    # 预编译的忽略大小写子串匹配，单次C层扫描代替逐个关键字 lower()+in
+    SENSITIVE_PATTERN = re.compile("|".join(map(re.escape, sorted(SENSITIVE_KEYS))), re.IGNORECASE)
     
     def filter(self, record):
         if hasattr(record, 'msg') and isinstance(record.msg, str):
-            msg_lower = record.msg.lower()
-            for key in self.SENSITIVE_KEYS:
-                if key in msg_lower:
-                    record.msg = f"[FILTERED] {key} redacted for security"
+            match = self.SENSITIVE_PATTERN.search(record.msg)
+            if match:
+                record.msg = f"[FILTERED] {match.group(0).lower()} redacted for security"
         return True
 
 logging.basicConfig(
@@ -235,8 +316,9 @@ async def favicon():
 @app.get("/api/health")
 async def health_check():
     """健康检查"""
+    warming = _seed_task is not None and not _seed_task.done()
     return {
-        "status": "healthy",
+        "status": "warming" if warming else "healthy",
         "timestamp": datetime.now().isoformat(),
         "version": "2.1.0",
         "data_records": len(usage_data),
@@ -259,18 +341,38 @@ async def clear_cache():
     count += cache_manager.clear_pattern("stats:*")
     return {"message": f"已清除 {count} 个缓存项"}
 
+# CSV导出每块包含的行数
+CSV_CHUNK_ROWS = 4096
+
 @app.get("/api/export/csv")
 @limiter.limit("10/minute")
 async def export_csv(request: Request):
     """导出CSV"""
     import csv
+    import io
     from fastapi.responses import StreamingResponse
     
     def generate():
-        yield '\ufeff'
-        yield "时间戳,模型,类型,Token数,成本,响应时间,状态\n"
-        for item in usage_data:
-            yield f"{item.get('timestamp','')},{item.get('model','')},{item.get('type','')},{item.get('tokens',0)},{item.get('cost',0):.4f},{item.get('response_time',0)},{item.get('status','')}\n"
+        # 行写入内存缓冲，每 CSV_CHUNK_ROWS 行输出一个块
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        buf.write('\ufeff')
+        writer.writerow(["时间戳", "模型", "类型", "Token数", "成本", "响应时间", "状态"])
+        for i, row in enumerate(usage_data, 1):
+            writer.writerow([
+                row.timestamp or '',
+                row.model or '',
+                row.type or '',
+                row.tokens or 0,
+                f"{row.cost or 0:.4f}",
+                row.responseTime or 0,
+                row.status or ''
+            ])
+            if i % CSV_CHUNK_ROWS == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate(0)
+        yield buf.getvalue()
     
     return StreamingResponse(
         generate(),
@@ -282,10 +384,8 @@ async def export_csv(request: Request):
 @limiter.limit("10/minute")
 async def export_json(request: Request):
     """导出JSON"""
-    from fastapi.responses import JSONResponse
-    
-    return JSONResponse(
-        usage_data,
+    return DefaultJSONResponse(
+        usage_store.records(),
         headers={"Content-Disposition": "attachment; filename=token_usage.json"}
     )
 
@@ -293,7 +393,7 @@ async def export_json(request: Request):
 @limiter.limit("10/minute")
 async def export_summary(request: Request):
     """导出统计摘要"""
-    return data_generator.get_data_summary(usage_data)
+    return _usage_summary()
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -331,12 +431,11 @@ def check_alerts():
     if not usage_data:
         return alerts
     
-    # 计算今日使用量
-    today = now.date()
-    daily_tokens = sum(
-        item.get("tokens", 0) for item in usage_data 
-        if datetime.fromisoformat(item.get("timestamp", now.isoformat()).replace(' ', 'T')).date() == today
-    )
+    # 计算今日使用量（按已排序的日期列二分定位今日区间）
+    usage_store.flush()
+    today = now.date().isoformat()
+    lo, hi = usage_store.date_bounds(today, today)
+    daily_tokens = sum(usage_store.tokens[lo:hi])
     
     if daily_tokens / 1000 > ALERT_THRESHOLDS["daily_limit"]:
         alerts.append({
@@ -348,7 +447,7 @@ def check_alerts():
     
     # 计算失败率
     total = len(usage_data)
-    failed = sum(1 for item in usage_data if item.get("status") == "failed")
+    failed = usage_store.statuses.count("failed")
     error_rate = failed / total if total > 0 else 0
     
     if error_rate > ALERT_THRESHOLDS["error_rate_threshold"]:
@@ -447,7 +546,32 @@ async def get_models():
         }
     }
 
-@app.get("/api/usage", response_model=UsageResponse)
+@lru_cache(maxsize=16)
+def _resolve_range(time_range: str, today: date) -> Tuple[str, str]:
+    """时间范围解析为 (开始日期, 结束日期)，按自然日/周/月/年计算，同一天内结果不变"""
+    if time_range == "day":
+        # 今日
+        start, end = today, today
+    elif time_range == "week":
+        # 本周（自然周：周一到周日）
+        weekday = today.weekday()  # 0=周一, 6=周日
+        start = today - timedelta(days=weekday)
+        end = today + timedelta(days=6 - weekday)
+    elif time_range == "month":
+        # 本月（自然月）
+        start = today.replace(day=1)
+        if today.month == 12:
+            end = date(today.year, 12, 31)
+        else:
+            end = date(today.year, today.month + 1, 1) - timedelta(days=1)
+    elif time_range == "year":
+        # 本年（自然年）
+        start, end = date(today.year, 1, 1), date(today.year, 12, 31)
+    else:
+        return "2000-01-01", "2099-12-31"
+    return start.isoformat(), end.isoformat()
+
+@app.get("/api/usage", response_model=None, responses={200: {"model": UsageResponse}})
 @limiter.limit("60/minute")
 async def get_usage(request: Request,
     params: UsageQueryParams = Depends()
@@ -464,184 +588,113 @@ async def get_usage(request: Request,
         "endDate": params.endDate
     }
     try:
-        filtered_data = usage_data.copy()
-        
         # 时间范围和日期选择器的逻辑：日期选择优先于时间范围
         # 如果用户选择了开始日期或结束日期，则使用日期范围，忽略timeRange
         has_custom_date = params.startDate or params.endDate
+        start_date, end_date = params.startDate, params.endDate
         
         if not has_custom_date and params.timeRange:
-            now = datetime.now()
-            if params.timeRange == "day":
-                # 今日
-                start_date = now.strftime("%Y-%m-%d")
-                end_date = now.strftime("%Y-%m-%d")
-            elif params.timeRange == "week":
-                # 本周（自然周：周一到周日）
-                weekday = now.weekday()  # 0=周一, 6=周日
-                start_date = (now - timedelta(days=weekday)).strftime("%Y-%m-%d")
-                end_date = (now + timedelta(days=6-weekday)).strftime("%Y-%m-%d")
-            elif params.timeRange == "month":
-                # 本月（自然月）
-                start_date = now.strftime("%Y-%m-01")
-                if now.month == 12:
-                    end_date = datetime(now.year, 12, 31).strftime("%Y-%m-%d")
-                else:
-                    end_date = datetime(now.year, now.month + 1, 1) - timedelta(days=1)
-                    end_date = end_date.strftime("%Y-%m-%d")
-            elif params.timeRange == "year":
-                # 本年（自然年）
-                start_date = datetime(now.year, 1, 1).strftime("%Y-%m-%d")
-                end_date = datetime(now.year, 12, 31).strftime("%Y-%m-%d")
-            
-            filtered_data = [
-                item for item in filtered_data 
-                if start_date <= item.get("timestamp", "")[:10] <= end_date
-            ]
-        
-        # 日期选择器过滤
-        if params.startDate:
-            filtered_data = [
-                item for item in filtered_data 
-                if item.get("timestamp", "")[:10] >= params.startDate
-            ]
-        
-        if params.endDate:
-            filtered_data = [
-                item for item in filtered_data 
-                if item.get("timestamp", "")[:10] <= params.endDate
-            ]
-        
-        # 其他过滤
-        if params.provider and params.provider != "all":
-            provider_val = params.provider.lower()
-            filtered_data = [
-                item for item in filtered_data 
-                if (item.get("provider") or "").lower() == provider_val
-            ]
+            start_date, end_date = _resolve_range(params.timeRange, date.today())
         
         # 模型过滤：具体模型 > 模型类型 (支持模糊匹配)
+        search = None
+        model_names = None
         if params.specificModel and params.specificModel != "all":
             search = params.specificModel.lower()
-            filtered_data = [
-                item for item in filtered_data 
-                if search in item.get("model_name", "").lower() or search in item.get("model", "").lower()
-            ]
         elif params.modelType == "free":
-            filtered_data = [
-                item for item in filtered_data 
-                if item.get("model_name", "") in FREE_MODELS
-            ]
+            model_names = FREE_MODELS
         elif params.modelType == "paid":
-            filtered_data = [
-                item for item in filtered_data 
-                if item.get("model_name", "") in PAID_MODELS
-            ]
+            model_names = PAID_MODELS
+        
+        indices = usage_store.select(
+            start_date=start_date,
+            end_date=end_date,
+            provider=params.provider if params.provider != "all" else None,
+            provider_ignore_case=True,
+            model_names=model_names,
+            search=search,
+            search_model_alias=True
+        )
         
         # 分页
-        total_filtered = len(filtered_data)
+        total_filtered = len(indices)
         offset = params.offset or 0
         limit = params.limit or 100
         end_idx = min(offset + limit, total_filtered)
         
-        paginated_data = filtered_data[offset:end_idx]
+        paginated_data = usage_store.take(indices[offset:end_idx])
         
-        # 转换为响应模型
+        # 按UsageResponse结构直接输出，跳过逐条的Pydantic模型构造与校验
         response_records = [
-            TokenUsageRecord(
-                timestamp=item["timestamp"],
-                model_name=item["model_name"],
-                model=item.get("model", item["model_name"].replace("gemini-", "").replace("-", " ").upper()),
-                tokens_used=item["tokens"],
-                cost=item["cost"],
-                provider=item["provider"],
-                session_id=item.get("session_id"),
-                response_time=item.get("responseTime"),
-                status=item.get("status", "success")
-            ) for item in paginated_data
+            {
+                "timestamp": row.timestamp,
+                "model_name": row.model_name,
+                "model": row.model if row.model is not None else row.model_name.replace("gemini-", "").replace("-", " ").upper(),
+                "tokens_used": row.tokens,
+                "cost": float(row.cost),
+                "provider": row.provider,
+                "session_id": row.session_id,
+                "response_time": row.responseTime,
+                "status": row.status if row.status is not None else "success"
+            } for row in paginated_data
         ]
         
-        return UsageResponse(
-            records=response_records,
-            total=total_filtered,
-            hasMore=end_idx < total_filtered
-        )
+        return DefaultJSONResponse({
+            "records": response_records,
+            "total": total_filtered,
+            "hasMore": end_idx < total_filtered
+        })
         
     except Exception as e:
         logger.error(f"获取使用数据失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取数据失败: {str(e)}")
 
-@app.get("/api/stats")
-@limiter.limit("60/minute")
-async def get_stats(
-    request: Request,
-    timeRange: str = Query("week", description="时间范围"),
-    modelType: str = Query("all", description="模型类型"),
-    specificModel: str = Query("all", description="具体模型"),
-    provider: str = Query("all", description="供应商"),
-    startDate: Optional[str] = Query(None, description="开始日期"),
-    endDate: Optional[str] = Query(None, description="结束日期")
-):
-    """获取统计信息（支持过滤）"""
-    
-    # 应用过滤逻辑
-    filtered_data = usage_data.copy()
-    
+def _stats_filters(timeRange: str, modelType: str, specificModel: str, provider: str,
+                   startDate: Optional[str] = None, endDate: Optional[str] = None) -> Tuple:
+    """规范化统计过滤条件为 (开始日期, 结束日期, 模型类型, 模型搜索词, 供应商)"""
     has_custom_date = startDate or endDate
+    start_date, end_date = "2000-01-01", "2099-12-31"
     
     if not has_custom_date and timeRange:
-        now = datetime.now()
-        if timeRange == "day":
-            start_date = now.strftime("%Y-%m-%d")
-            end_date = now.strftime("%Y-%m-%d")
-        elif timeRange == "week":
-            weekday = now.weekday()
-            start_date = (now - timedelta(days=weekday)).strftime("%Y-%m-%d")
-            end_date = (now + timedelta(days=6-weekday)).strftime("%Y-%m-%d")
-        elif timeRange == "month":
-            start_date = now.strftime("%Y-%m-01")
-            if now.month == 12:
-                end_date = datetime(now.year, 12, 31).strftime("%Y-%m-%d")
-            else:
-                end_date = datetime(now.year, now.month + 1, 1) - timedelta(days=1)
-                end_date = end_date.strftime("%Y-%m-%d")
-        elif timeRange == "year":
-            start_date = datetime(now.year, 1, 1).strftime("%Y-%m-%d")
-            end_date = datetime(now.year, 12, 31).strftime("%Y-%m-%d")
-        else:
-            start_date = "2000-01-01"
-            end_date = "2099-12-31"
-        
-        filtered_data = [
-            item for item in filtered_data 
-            if start_date <= item.get("timestamp", "")[:10] <= end_date
-        ]
-    elif startDate or endDate:
-        s = startDate or "2000-01-01"
-        e = endDate or datetime.now().strftime("%Y-%m-%d")
-        filtered_data = [
-            item for item in filtered_data
-            if s <= item.get("timestamp", "")[:10] <= e
-        ]
-    
+        start_date, end_date = _resolve_range(timeRange, date.today())
+    elif has_custom_date:
+        start_date = startDate or "2000-01-01"
+        end_date = endDate or date.today().isoformat()
+    
+    return (
+        start_date, end_date,
+        modelType if modelType in ("paid", "free") else "all",
+        specificModel.lower() if specificModel and specificModel != "all" else None,
+        provider if provider != "all" else None
+    )
+
+# 统计缓存代号，写入新记录时递增使旧键失效（旧条目随TTL过期），无需扫描键空间
+_stats_generation = 0
+
+def _stats_cache_key(*filters) -> str:
+    """统计缓存键：缓存代号 + 规范化过滤条件的blake2b摘要"""
+    payload = json.dumps(filters, separators=(",", ":"))
+    return f"stats:{_stats_generation}:" + hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+def _compute_stats(start_date: str, end_date: str, model_type: str,
+                   search: Optional[str], provider: Optional[str]) -> Dict[str, Any]:
+    """按规范化过滤条件计算统计结果"""
     # 模型类型过滤
-    if modelType == "paid":
-        filtered_data = [item for item in filtered_data if item.get("model_name") in PAID_MODELS]
-    elif modelType == "free":
-        filtered_data = [item for item in filtered_data if item.get("model_name") in FREE_MODELS]
-    
-    # 具体模型过滤
-    if specificModel and specificModel != "all":
-        filtered_data = [
-            item for item in filtered_data 
-            if specificModel.lower() in item.get("model_name", "").lower()
-        ]
-    
-    # 供应商过滤
-    if provider and provider != "all":
-        filtered_data = [item for item in filtered_data if item.get("provider") == provider]
+    model_names = None
+    if model_type == "paid":
+        model_names = PAID_MODELS
+    elif model_type == "free":
+        model_names = FREE_MODELS
+    
+    indices = usage_store.select(
+        start_date=start_date,
+        end_date=end_date,
+        provider=provider,
+        model_names=model_names,
+        search=search
+    )
     
-    if not filtered_data:
+    if not indices:
         return {
             "total_tokens": 0,
             "total_cost": 0.0,
@@ -653,42 +706,86 @@ async def get_stats(
             "date_range": "N/A"
         }
     
+    agg = usage_store.aggregate(indices, provider=provider, model_names=model_names)
+    total_tokens = agg["total_tokens"]
+    total_requests = agg["total_requests"]
+    average_tokens = total_tokens / total_requests if total_requests > 0 else 0
+    success_rate = (agg["success_count"] / total_requests) * 100 if total_requests > 0 else 100.0
+    
+    return StatsResponse(
+        total_tokens=total_tokens,
+        total_cost=agg["total_cost"],
+        total_requests=total_requests,
+        average_tokens=average_tokens,
+        model_distribution=agg["model_distribution"],
+        provider_distribution=agg["provider_distribution"],
+        success_rate=success_rate,
+        date_range=f"{start_date} 至 {end_date}"
+    ).model_dump()
+
+# 启动及数据清空后预热的常用统计查询 (timeRange, modelType)
+STATS_WARMUP_SHAPES = (
+    ("day", "all"),
+    ("week", "all"),
+    ("month", "all"),
+    ("year", "all"),
+    ("week", "paid"),
+)
+# 新增记录后延迟预热的时间（秒），窗口内的多次写入合并为一次预热
+STATS_WARMUP_DELAY = 5.0
+
+_stats_warmup_handle: Optional[asyncio.TimerHandle] = None
+
+def warm_stats_cache() -> int:
+    """计算常用统计并通过一次批量写入预热缓存"""
+    items = {}
+    for time_range, model_type in STATS_WARMUP_SHAPES:
+        filters = _stats_filters(time_range, model_type, "all", "all")
+        items[_stats_cache_key(*filters)] = _compute_stats(*filters)
+    return cache_manager.set_many(items, CACHE_TTL["stats"])
+
+def _run_stats_warmup():
+    global _stats_warmup_handle
+    _stats_warmup_handle = None
     try:
-        total_tokens = sum(item.get("tokens", 0) for item in filtered_data)
-        total_cost = sum(item.get("cost", 0.0) for item in filtered_data)
-        total_requests = len(filtered_data)
-        average_tokens = total_tokens / total_requests if total_requests > 0 else 0
-        
-        # 模型分布统计
-        model_distribution = {}
-        for item in filtered_data:
-            model = item.get("model_name", "unknown")
-            model_distribution[model] = model_distribution.get(model, 0) + 1
-        
-        # 供应商分布统计
-        provider_distribution = {}
-        for item in filtered_data:
-            provider = item.get("provider", "unknown")
-            provider_distribution[provider] = provider_distribution.get(provider, 0) + 1
-        
-        # 成功率统计
-        success_count = sum(1 for item in filtered_data if item.get("status") == "success")
-        success_rate = (success_count / total_requests) * 100 if total_requests > 0 else 100.0
-        
-        return StatsResponse(
-            total_tokens=total_tokens,
-            total_cost=total_cost,
-            total_requests=total_requests,
-            average_tokens=average_tokens,
-            model_distribution=model_distribution,
-            provider_distribution=provider_distribution,
-            success_rate=success_rate,
-            date_range=f"{start_date} 至 {end_date}"
-        )
-        
+        warm_stats_cache()
+    except Exception as e:
+        logger.warning(f"统计缓存预热失败: {e}")
+
+def _schedule_stats_warmup():
+    """延迟预热统计缓存，已有待执行的预热时不重复安排"""
+    global _stats_warmup_handle
+    if _stats_warmup_handle is None:
+        _stats_warmup_handle = asyncio.get_running_loop().call_later(STATS_WARMUP_DELAY, _run_stats_warmup)
+
+@app.get("/api/stats")
+@limiter.limit("60/minute")
+async def get_stats(
+    request: Request,
+    timeRange: str = Query("week", description="时间范围"),
+    modelType: str = Query("all", description="模型类型"),
+    specificModel: str = Query("all", description="具体模型"),
+    provider: str = Query("all", description="供应商"),
+    startDate: Optional[str] = Query(None, description="开始日期"),
+    endDate: Optional[str] = Query(None, description="结束日期")
+):
+    """获取统计信息（支持过滤）"""
+    
+    # 命中缓存直接返回（相对时间范围已解析为具体日期）
+    filters = _stats_filters(timeRange, modelType, specificModel, provider, startDate, endDate)
+    cache_key = _stats_cache_key(*filters)
+    cached = cache_manager.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    try:
+        result = _compute_stats(*filters)
     except Exception as e:
         logger.error(f"获取统计失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取统计失败: {str(e)}")
+    
+    cache_manager.set(cache_key, result, CACHE_TTL["stats"])
+    return result
 
 @app.get("/api/stats/history")
 @limiter.limit("60/minute")
@@ -705,22 +802,17 @@ async def get_history_stats(request: Request):
         }
     
     try:
-        total_tokens = sum(item.get("tokens", 0) for item in usage_data)
-        total_cost = sum(item.get("cost", 0.0) for item in usage_data)
-        total_requests = len(usage_data)
-        
-        # 唯一模型数
-        unique_models = len(set(item.get("model_name", "") for item in usage_data))
-        
-        # 唯一供应商数
-        unique_providers = len(set(item.get("provider", "") for item in usage_data))
+        # 累计值由usage_store在写入时增量维护，无需遍历全部记录
+        usage_store.flush()
+        total_tokens = usage_store.total_tokens
+        total_cost = usage_store.total_cost
+        total_requests = len(usage_store)
+        unique_models = len(usage_store.model_counts)
+        unique_providers = len(usage_store.provider_counts)
         
         # 数据时间范围
-        timestamps = [item.get("timestamp", "") for item in usage_data if item.get("timestamp")]
-        if timestamps:
-            date_range = f"{min(timestamps)[:10]} 至 {max(timestamps)[:10]}"
-        else:
-            date_range = "N/A"
+        span = usage_store.date_span()
+        date_range = f"{span[0]} 至 {span[1]}" if span else "N/A"
         
         return {
             "total_tokens": total_tokens,
@@ -735,27 +827,49 @@ async def get_history_stats(request: Request):
         logger.error(f"获取历史统计失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取历史统计失败: {str(e)}")
 
+def _usage_summary() -> Dict[str, Any]:
+    """数据摘要，直接取usage_store增量维护的累计值，不为每条记录构造字典"""
+    usage_store.flush()
+    if not usage_store:
+        return {"total_records": 0}
+    
+    span = usage_store.date_span()
+    return {
+        "total_records": len(usage_store),
+        "total_tokens": usage_store.total_tokens,
+        "total_cost": usage_store.total_cost,
+        "model_stats": dict(usage_store.model_counts),
+        "provider_stats": dict(usage_store.provider_counts),
+        "date_range": f"{span[0]} 至 {span[1]}" if span else "N/A"
+    }
+
 @app.post("/api/usage")
 @limiter.limit("30/minute")
 async def record_usage(request: Request,
     record: TokenUsageRecord
 ):
     """记录使用情况"""
+    global _stats_generation
     try:
-        # 添加记录
-        new_record = {
-            "timestamp": record.timestamp,
-            "model_name": record.model_name,
-            "model": record.model,
-            "tokens_used": record.tokens_used,
-            "cost": record.cost,
-            "provider": record.provider,
-            "session_id": record.session_id,
-            "responseTime": record.response_time,
-            "status": record.status
-        }
+        # 添加记录；同时填写tokens与type，新增记录计入统计的Token总数及告警阈值
+        # （原字典记录缺少这两个键，按0 Token计入）
+        new_record = UsageRow(
+            timestamp=record.timestamp,
+            model_name=record.model_name,
+            model=record.model,
+            tokens_used=record.tokens_used,
+            tokens=record.tokens_used,
+            cost=record.cost,
+            provider=record.provider,
+            session_id=record.session_id,
+            type="paid" if record.model_name in PAID_MODELS else "free",
+            responseTime=record.response_time,
+            status=record.status
+        )
         
-        usage_data.append(new_record)
+        usage_store.append(new_record)
+        _stats_generation += 1
+        _schedule_stats_warmup()
         
         logger.info(f"记录使用情况: {record.model_name} - {record.tokens_used} tokens")
         
@@ -773,29 +887,31 @@ async def record_usage(request: Request,
 @limiter.limit("60/minute")
 async def get_summary(request: Request):
     """获取数据摘要"""
-    return data_generator.get_data_summary(usage_data)
+    return _usage_summary()
 
 @app.delete("/api/usage/clear")
 async def clear_data():
     """清空所有数据"""
     global usage_data
     usage_data.clear()
+    usage_store.reset(usage_data)
     
     cache_manager.clear_pattern("usage:*")
+    cache_manager.clear_pattern("stats:*")
+    warm_stats_cache()
     
     logger.info("所有使用数据已清空，缓存已失效")
     return {"status": "success", "message": "All data cleared"}
 
+def _preferred_impl(module: str, fallback: str) -> str:
+    """已安装C实现（uvloop/httptools）时优先使用，否则回退到纯Python实现"""
+    return module if importlib.util.find_spec(module) is not None else fallback
+
 # 启动函数
 def main():
     """主启动函数"""
     logger.info("🚀 启动企业版Token监控系统...")
     
-    # 初始化数据
-    global usage_data
-    usage_data = data_generator.generate_historical_data(30)
-    logger.info(f"已生成 {len(usage_data)} 条历史数据")
-    
     host = os.getenv("API_HOST", "0.0.0.0")
     port = int(os.getenv("API_PORT", "8000"))
     
@@ -806,7 +922,9 @@ def main():
         app,
         host=host,
         port=port,
-        log_level="info"
+        log_level="info",
+        loop=_preferred_impl("uvloop", "asyncio"),
+        http=_preferred_impl("httptools", "h11")
     )
 
 if __name__ == "__main__":
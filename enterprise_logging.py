@@ -4,18 +4,68 @@
 提供结构化日志、指标收集、告警通知等功能
 """
 
+import atexit
 import logging
 import json
+import queue
 import sys
 import time
 import traceback
-from datetime import datetime, timedelta
+from bisect import bisect_right
+from collections import Counter, defaultdict, deque
+from itertools import islice
+from datetime import datetime
 from typing import Dict, Any, Optional, List
 from pathlib import Path
-from functools import wraps
+from functools import partial, wraps
+from operator import attrgetter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import asyncio
 import psutil
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, fields
+
+# 日志级别名称到数值的映射，未列出的级别按DEBUG处理
+_LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+    'CRITICAL': logging.CRITICAL,
+}
+
+# 控制台日志级别颜色
+_LEVEL_COLOR = {
+    'DEBUG': '\033[36m',      # Cyan
+    'INFO': '\033[32m',       # Green
+    'WARNING': '\033[33m',    # Yellow
+    'ERROR': '\033[31m',      # Red
+    'CRITICAL': '\033[35m'    # Magenta
+}
+_RESET = '\033[0m'
+
+try:
+    import orjson
+    
+    def _json_text(obj) -> str:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_text = json.JSONEncoder(default=str, ensure_ascii=False).encode
+    _json_loads = json.loads
+
+
+class _StructuredMessage:
+    """结构化日志消息，仅在需要文本时（如传播到根日志器）才序列化为JSON"""
+    
+    __slots__ = ('data',)
+    
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+    
+    def __str__(self) -> str:
+        return _json_text(self.data)
 
 
 @dataclass
@@ -42,27 +92,128 @@ class PerformanceMetrics:
     active_connections: int
     response_time: Optional[float] = None
     endpoint: Optional[str] = None
+    timestamp_epoch: float = field(default_factory=time.time)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典，字段固定，直接构造比 asdict 的递归拷贝快"""
+        return {
+            'timestamp': self.timestamp,
+            'cpu_percent': self.cpu_percent,
+            'memory_percent': self.memory_percent,
+            'disk_usage': self.disk_usage,
+            'network_io': dict(self.network_io),
+            'active_connections': self.active_connections,
+            'response_time': self.response_time,
+            'endpoint': self.endpoint,
+            'timestamp_epoch': self.timestamp_epoch
+        }
+
+
+# 可作为告警条件的性能指标字段
+_METRIC_FIELDS = frozenset(f.name for f in fields(PerformanceMetrics))
 
 
 @dataclass
 class AlertRule:
     """告警规则"""
+    __slots__ = ('name', 'condition', 'threshold', 'severity', 'enabled', '_getter')
+    
     name: str
     condition: str
     threshold: float
     severity: str
     enabled: bool
+    
+    def __post_init__(self):
+        # 预先构造取值函数；条件不是性能指标字段（如 error_rate）时不参与采样检查
+        self._getter = attrgetter(self.condition) if self.condition in _METRIC_FIELDS else None
+
+
+class _StructuredQueueHandler(QueueHandler):
+    """入队时不预先格式化消息，处理器在后台线程直接读取 log_data"""
+    
+    def prepare(self, record):
+        # 调用位置已由 logging 在创建记录时确定，直接补入结构化数据
+        log_data = getattr(record, 'log_data', None)
+        if log_data is not None:
+            log_data['module'] = record.module
+            log_data['function'] = record.funcName
+            log_data['line_number'] = record.lineno
+        return record
+
+
+class _BatchingQueueListener(QueueListener):
+    """队列排空时才刷新处理器缓冲，连续的日志合并为批量写入"""
+    
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            for handler in self.handlers:
+                handler.flush()
+            return self.queue.get(block)
+
+
+def _build_metrics(epoch: float, cpu: float, memory: float, disk: float,
+                   bytes_sent: int, bytes_recv: int, connections: int) -> PerformanceMetrics:
+    """由一次采样的各列数值构造指标对象"""
+    return PerformanceMetrics(
+        timestamp=datetime.fromtimestamp(epoch).isoformat(),
+        cpu_percent=cpu,
+        memory_percent=memory,
+        disk_usage=disk,
+        network_io={'bytes_sent': bytes_sent, 'bytes_recv': bytes_recv},
+        active_connections=connections,
+        timestamp_epoch=epoch
+    )
+
+
+def _latency_percentiles(latencies) -> Dict[str, float]:
+    """端点最近响应时间的均值与分位数（最近秩法）"""
+    values = sorted(latencies)
+    count = len(values)
+    
+    def rank(percent: int) -> float:
+        # 第 ceil(count * percent / 100) 个值
+        return values[-(-count * percent // 100) - 1]
+    
+    return {
+        'count': count,
+        'avg': sum(values) / count,
+        'p50': rank(50),
+        'p95': rank(95),
+        'p99': rank(99),
+        'max': values[-1]
+    }
 
 
 class EnterpriseLogger:
     """企业级日志系统"""
     
+    # 保留的性能指标样本数
+    METRICS_HISTORY = 1000
+    # 后台采集系统指标的间隔（秒）
+    METRICS_INTERVAL = 5.0
+    
     def __init__(self, name: str = "token_monitor"):
         self.name = name
         self.logger = self._setup_logger()
-        self.performance_metrics = []
+        # 最近的性能指标按列保存（只含数值，不保留对象），超出时自动丢弃最早的
+        self._metric_times = deque(maxlen=self.METRICS_HISTORY)
+        self._cpu_values = deque(maxlen=self.METRICS_HISTORY)
+        self._memory_values = deque(maxlen=self.METRICS_HISTORY)
+        self._disk_values = deque(maxlen=self.METRICS_HISTORY)
+        self._bytes_sent = deque(maxlen=self.METRICS_HISTORY)
+        self._bytes_recv = deque(maxlen=self.METRICS_HISTORY)
+        self._connection_counts = deque(maxlen=self.METRICS_HISTORY)
+        # 端点响应时间单独记录，请求路径上不采集系统指标
+        self._response_epochs = deque(maxlen=self.METRICS_HISTORY)
+        self._response_times = deque(maxlen=self.METRICS_HISTORY)
+        # 各端点最近的响应时间（毫秒）
+        self.endpoint_latencies = defaultdict(partial(deque, maxlen=self.METRICS_HISTORY))
+        self._metrics_task: Optional[asyncio.Task] = None
         self.alert_rules = self._setup_alert_rules()
-        self.error_counts = {}
+        self.error_counts: Counter = Counter()
         
     def _setup_logger(self) -> logging.Logger:
         """设置结构化日志器"""
@@ -72,6 +223,9 @@ class EnterpriseLogger:
         # 清除现有处理器
         logger.handlers.clear()
         
+        # 请求线程只入队，格式化与文件I/O由后台监听线程完成
+        self._queue = queue.SimpleQueue()
+        
         # 控制台处理器
         console_handler = StructuredConsoleHandler()
         console_handler.setLevel(logging.INFO)
@@ -92,12 +246,25 @@ class EnterpriseLogger:
         )
         error_handler.setLevel(logging.ERROR)
         
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
-        logger.addHandler(error_handler)
+        logger.addHandler(_StructuredQueueHandler(self._queue))
+        self._handlers = (console_handler, file_handler, error_handler)
+        self._listener = _BatchingQueueListener(
+            self._queue, *self._handlers, respect_handler_level=True
+        )
+        self._listener.start()
+        atexit.register(self.close)
         
         return logger
     
+    def close(self):
+        """停止后台日志线程，写完队列中剩余日志并关闭文件"""
+        if self._listener is None:
+            return
+        self._listener.stop()
+        self._listener = None
+        for handler in self._handlers:
+            handler.close()
+    
     def _setup_alert_rules(self) -> List[AlertRule]:
         """设置告警规则"""
         return [
@@ -110,47 +277,49 @@ class EnterpriseLogger:
     
     def log_structured(self, level: str, message: str, **kwargs):
         """记录结构化日志"""
-        # 获取调用栈信息
-        frame = sys._getframe(1)
-        module = frame.f_globals.get('__name__', 'unknown')
-        function = frame.f_code.co_name
-        line_number = frame.f_lineno if hasattr(frame, 'f_lineno') else None
+        levelno = _LEVELS.get(level.upper(), logging.DEBUG)
+        is_error = levelno >= logging.ERROR
+        # 级别被过滤且无需计数时直接返回，不构造日志内容
+        if not is_error and not self.logger.isEnabledFor(levelno):
+            return
         
-        log_entry = LogEntry(
-            timestamp=datetime.now().isoformat(),
-            level=level,
-            message=message,
-            module=module,
-            function=function,
-            line_number=line_number,
-            exception=kwargs.get('exception'),
-            extra_data=kwargs.get('extra_data')
-        )
+        # 字段与LogEntry一致，直接构造字典省去asdict的递归拷贝
+        now = time.time()
+        log_data = {
+            'timestamp': datetime.fromtimestamp(now).isoformat(),
+            'timestamp_epoch': now,
+            'level': level,
+            'message': message,
+            'module': 'unknown',
+            'function': 'unknown',
+            'line_number': 0,
+            'exception': kwargs.get('exception'),
+            'extra_data': kwargs.get('extra_data')
+        }
         
-        # 记录到结构化日志
-        if level.upper() == 'ERROR':
-            self.logger.error(json.dumps(asdict(log_entry), default=str), exc_info=kwargs.get('exc_info'))
-        elif level.upper() == 'WARNING':
-            self.logger.warning(json.dumps(asdict(log_entry), default=str))
-        elif level.upper() == 'INFO':
-            self.logger.info(json.dumps(asdict(log_entry), default=str))
-        else:
-            self.logger.debug(json.dumps(asdict(log_entry), default=str))
+        # 记录到结构化日志，处理器直接读取 record.log_data；
+        # stacklevel=2 使 logging 记录本方法调用方的位置，入队时补入 log_data
+        self.logger.log(
+            levelno,
+            _StructuredMessage(log_data),
+            exc_info=kwargs.get('exc_info') if is_error else None,
+            extra={'log_data': log_data},
+            stacklevel=2
+        )
         
         # 更新错误计数
-        if level.upper() == 'ERROR':
-            self._increment_error_count(module, function)
+        if is_error:
+            self._increment_error_count(log_data['module'], log_data['function'])
     
     def _increment_error_count(self, module: str, function: str):
         """增加错误计数"""
-        key = f"{module}.{function}"
-        self.error_counts[key] = self.error_counts.get(key, 0) + 1
+        self.error_counts[f"{module}.{function}"] += 1
     
     def collect_performance_metrics(self) -> PerformanceMetrics:
         """收集性能指标"""
         try:
-            # CPU和内存使用率
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # CPU和内存使用率（interval=None 返回距上次调用的占用率，不阻塞）
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             
@@ -158,25 +327,18 @@ class EnterpriseLogger:
             net_io = psutil.net_io_counters()
             
             # 当前时间
-            timestamp = datetime.now().isoformat()
-            
-            metrics = PerformanceMetrics(
-                timestamp=timestamp,
-                cpu_percent=cpu_percent,
-                memory_percent=memory.percent,
-                disk_usage=disk.percent,
-                network_io={
-                    'bytes_sent': getattr(net_io, 'bytes_sent', 0),
-                    'bytes_recv': getattr(net_io, 'bytes_recv', 0)
-                },
-                active_connections=len(self.performance_metrics) if self.performance_metrics else 0
-            )
+            now = time.time()
             
-            self.performance_metrics.append(metrics)
+            self._metric_times.append(now)
+            self._cpu_values.append(cpu_percent)
+            self._memory_values.append(memory.percent)
+            self._disk_values.append(disk.percent)
+            self._bytes_sent.append(getattr(net_io, 'bytes_sent', 0))
+            self._bytes_recv.append(getattr(net_io, 'bytes_recv', 0))
+            self._connection_counts.append(len(self._connection_counts))
             
-            # 保留最近1000个指标
-            if len(self.performance_metrics) > 1000:
-                self.performance_metrics = self.performance_metrics[-1000:]
+            # 指标对象只用于返回和告警，不随历史保留
+            metrics = self._metrics_at(-1)
             
             # 检查告警
             self._check_alerts(metrics)
@@ -191,17 +353,55 @@ class EnterpriseLogger:
                 cpu_percent=0.0,
                 memory_percent=0.0,
                 disk_usage=0.0,
-                network_io={'bytes_sent': 0, 'bytes_recv': 0}
+                network_io={'bytes_sent': 0, 'bytes_recv': 0},
+                active_connections=0
             )
     
+    def _metric_columns(self) -> tuple:
+        """与 _build_metrics 参数顺序一致的指标列"""
+        return (
+            self._metric_times, self._cpu_values, self._memory_values, self._disk_values,
+            self._bytes_sent, self._bytes_recv, self._connection_counts
+        )
+    
+    def _metrics_at(self, index: int) -> PerformanceMetrics:
+        """由列数据构造第 index 个采样的指标对象"""
+        return _build_metrics(*[column[index] for column in self._metric_columns()])
+    
+    @property
+    def performance_metrics(self) -> List[PerformanceMetrics]:
+        """最近的性能指标（按需由列数据构造）"""
+        return [_build_metrics(*values) for values in zip(*self._metric_columns())]
+    
+    def record_response_time(self, endpoint: str, response_time: float):
+        """记录端点响应时间（毫秒）"""
+        self._response_epochs.append(time.time())
+        self._response_times.append(response_time)
+        self.endpoint_latencies[endpoint].append(response_time)
+    
+    def start_metrics_collection(self):
+        """在当前事件循环中启动后台指标采集（已启动时忽略）"""
+        if self._metrics_task is not None and not self._metrics_task.done():
+            return
+        # 首次调用只建立CPU占用率的基准
+        psutil.cpu_percent(interval=None)
+        self._metrics_task = asyncio.get_running_loop().create_task(self._metrics_loop())
+    
+    async def _metrics_loop(self):
+        """按固定间隔采集系统指标"""
+        while True:
+            await asyncio.sleep(self.METRICS_INTERVAL)
+            self.collect_performance_metrics()
+    
+    
     def _check_alerts(self, metrics: PerformanceMetrics):
         """检查告警条件"""
         for rule in self.alert_rules:
-            if not rule.enabled:
+            if not rule.enabled or rule._getter is None:
                 continue
                 
-            value = getattr(metrics, rule.condition, 0.0)
-            if value > rule.threshold:
+            value = rule._getter(metrics)
+            if value is not None and value > rule.threshold:
                 self._send_alert(rule, metrics, value)
     
     def _send_alert(self, rule: AlertRule, metrics: PerformanceMetrics, value: float):
@@ -213,7 +413,7 @@ class EnterpriseLogger:
             'current_value': value,
             'threshold': rule.threshold,
             'severity': rule.severity,
-            'metrics': asdict(metrics)
+            'metrics': metrics.to_dict()
         }
         
         self.log_structured('WARNING', f"告警触发: {rule.name}", extra_data=alert_data)
@@ -223,49 +423,42 @@ class EnterpriseLogger:
     
     def get_error_summary(self, minutes: int = 60) -> Dict[str, Any]:
         """获取错误摘要"""
-        cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        
-        recent_errors = {}
-        total_errors = 0
-        
-        for key, count in self.error_counts.items():
-            if count > 0:
-                recent_errors[key] = count
-                total_errors += count
-        
+        # 计数只增不减，均为正数，无需再过滤
         return {
             'time_window_minutes': minutes,
-            'total_errors': total_errors,
-            'error_breakdown': recent_errors,
-            'top_error_modules': self._get_top_errors(recent_errors, 5)
+            'total_errors': sum(self.error_counts.values()),
+            'error_breakdown': dict(self.error_counts),
+            'top_error_modules': self._get_top_errors(5)
         }
     
-    def _get_top_errors(self, errors: Dict[str, int], limit: int) -> List[Dict[str, Any]]:
+    def _get_top_errors(self, limit: int) -> List[Dict[str, Any]]:
         """获取最多的错误"""
-        sorted_errors = sorted(errors.items(), key=lambda x: x[1], reverse=True)
-        return [{'module_function': k, 'count': v} for k, v in sorted_errors[:limit]]
+        return [
+            {'module_function': k, 'count': v}
+            for k, v in self.error_counts.most_common(limit)
+        ]
     
     def get_performance_summary(self, minutes: int = 60) -> Dict[str, Any]:
         """获取性能摘要"""
-        if not self.performance_metrics:
+        if not self._metric_times:
             return {'status': 'no_data'}
         
-        cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        recent_metrics = [
-            m for m in self.performance_metrics 
-            if datetime.fromisoformat(m.timestamp) > cutoff_time
-        ]
+        # 采样时间单调递增，二分定位时间窗口起点
+        cutoff = time.time() - minutes * 60
+        start = bisect_right(self._metric_times, cutoff)
+        sample_count = len(self._metric_times) - start
         
-        if not recent_metrics:
+        if not sample_count:
             return {'status': 'no_recent_data'}
         
-        cpu_values = [m.cpu_percent for m in recent_metrics]
-        memory_values = [m.memory_percent for m in recent_metrics]
-        response_times = [m.response_time for m in recent_metrics if m.response_time]
+        cpu_values = list(islice(self._cpu_values, start, None))
+        memory_values = list(islice(self._memory_values, start, None))
+        response_start = bisect_right(self._response_epochs, cutoff)
+        response_times = list(islice(self._response_times, response_start, None))
         
         return {
             'time_window_minutes': minutes,
-            'sample_count': len(recent_metrics),
+            'sample_count': sample_count,
             'cpu': {
                 'avg': sum(cpu_values) / len(cpu_values),
                 'max': max(cpu_values),
@@ -280,6 +473,11 @@ class EnterpriseLogger:
                 'avg': sum(response_times) / len(response_times) if response_times else 0,
                 'max': max(response_times) if response_times else 0,
                 'min': min(response_times) if response_times else 0
+            },
+            'endpoints': {
+                endpoint: _latency_percentiles(latencies)
+                for endpoint, latencies in self.endpoint_latencies.items()
+                if latencies
             }
         }
     
@@ -290,26 +488,32 @@ class EnterpriseLogger:
             if not log_file.exists():
                 return {'status': 'no_log_file'}
             
-            cutoff_time = datetime.now() - timedelta(hours=hours)
+            cutoff_time = time.time() - hours * 3600
             
-            exported_entries = []
-            with open(log_file, 'r', encoding='utf-8') as f:
+            # 逐行流式写出JSON数组，原行已是合法JSON，无需再序列化；
+            # 以字节读写，不逐行解码为 str
+            output_path = Path(output_file)
+            exported_count = 0
+            with open(log_file, 'rb') as f, open(output_path, 'wb', buffering=1 << 20) as out:
+                out.write(b'[\n')
                 for line in f:
+                    line = line.strip()
                     try:
-                        log_entry = json.loads(line.strip())
-                        entry_time = datetime.fromisoformat(log_entry['timestamp'])
-                        if entry_time > cutoff_time:
-                            exported_entries.append(log_entry)
-                    except json.JSONDecodeError:
+                        log_entry = _json_loads(line)
+                        entry_time = log_entry.get('timestamp_epoch')
+                        if entry_time is None:
+                            # 兼容未记录时间戳数值的旧日志
+                            entry_time = datetime.fromisoformat(log_entry['timestamp']).timestamp()
+                    except ValueError:
                         continue
-            
-            output_path = Path(output_file)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(exported_entries, f, indent=2, ensure_ascii=False)
+                    if entry_time > cutoff_time:
+                        out.write(b',\n' + line if exported_count else line)
+                        exported_count += 1
+                out.write(b'\n]\n')
             
             return {
                 'status': 'success',
-                'exported_count': len(exported_entries),
+                'exported_count': exported_count,
                 'output_file': str(output_path)
             }
             
@@ -325,32 +529,68 @@ class StructuredConsoleHandler(logging.Handler):
     
     def emit(self, record):
         """输出格式化的日志"""
-        try:
-            log_data = json.loads(record.getMessage())
-            level_color = {
-                'DEBUG': '\033[36m',      # Cyan
-                'INFO': '\033[32m',       # Green
-                'WARNING': '\033[33m',    # Yellow
-                'ERROR': '\033[31m',      # Red
-                'CRITICAL': '\033[35m'    # Magenta
-            }.get(record.levelname, '\033[0m')
-            
-            reset_color = '\033[0m'
-            
-            print(f"{level_color}{record.levelname}{reset_color} "
-                  f"{log_data['timestamp']} "
-                  f"[{log_data.get('module', 'unknown')}] "
-                  f"{log_data['message']}")
-                  
-            if log_data.get('exception'):
-                print(f"Exception: {log_data['exception']}")
-                
-        except json.JSONDecodeError:
+        log_data = getattr(record, 'log_data', None)
+        if log_data is None:
             print(f"{record.levelname}: {record.getMessage()}")
+            return
+        
+        line = (
+            f"{_LEVEL_COLOR.get(record.levelname, _RESET)}{record.levelname}{_RESET} "
+            f"{log_data['timestamp']} "
+            f"[{log_data.get('module', 'unknown')}] "
+            f"{log_data['message']}\n"
+        )
+        if log_data.get('exception'):
+            line += f"Exception: {log_data['exception']}\n"
+        sys.stdout.write(line)
+
+
+class _BufferedRotatingFileHandler(RotatingFileHandler):
+    """64KB写缓冲的轮转文件处理器，逐条记录不刷新，由 flush_buffer 显式刷新
+    
+    文件大小由写入字节数累计，轮转判断不再每条记录 seek/tell 文件。
+    """
+    
+    BUFFER_SIZE = 64 * 1024
+    
+    def _open(self):
+        stream = open(self.baseFilename, self.mode, buffering=self.BUFFER_SIZE,
+                      encoding=self.encoding, errors=getattr(self, 'errors', None))
+        self._size = stream.seek(0, 2)
+        return stream
+    
+    def emit(self, record):
+        try:
+            self.write_line(self.format(record))
+        except Exception:
+            self.handleError(record)
+    
+    def write_line(self, line: str):
+        """写入一行文本，必要时先轮转"""
+        if self.stream is None:
+            self.stream = self._open()
+        msg = line + self.terminator
+        size = len(msg.encode(self.stream.encoding, 'replace'))
+        if self.maxBytes > 0 and self._size and self._size + size >= self.maxBytes:
+            self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+        self.stream.write(msg)
+        self._size += size
+    
+    def flush(self):
+        pass
+    
+    def flush_buffer(self):
+        super().flush()
+
+
+# 已创建的日志目录
+_log_dirs = set()
 
 
 class StructuredFileHandler(logging.Handler):
-    """结构化文件日志处理器"""
+    """结构化文件日志处理器，每行一条JSON日志（export_logs 按行解析）"""
     
     def __init__(self, filename: str, max_bytes: int = 10*1024*1024, backup_count: int = 5):
         super().__init__()
@@ -358,12 +598,14 @@ class StructuredFileHandler(logging.Handler):
         self.max_bytes = max_bytes
         self.backup_count = backup_count
         
-        # 创建日志目录
-        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        # 创建日志目录（同一目录只创建一次）
+        parent = Path(filename).parent
+        if parent not in _log_dirs:
+            parent.mkdir(parents=True, exist_ok=True)
+            _log_dirs.add(parent)
         
         # 设置文件轮转
-        from logging.handlers import RotatingFileHandler
-        self.handler = RotatingFileHandler(
+        self.handler = _BufferedRotatingFileHandler(
             filename=filename,
             maxBytes=max_bytes,
             backupCount=backup_count,
@@ -372,59 +614,46 @@ class StructuredFileHandler(logging.Handler):
     
     def emit(self, record):
         """写入格式化的日志"""
+        log_data = getattr(record, 'log_data', None)
+        if log_data is None:
+            self.handler.emit(record)
+            return
+        
         try:
-            log_data = json.loads(record.getMessage())
-            
-            # 添加格式化的时间戳
-            timestamp = datetime.fromisoformat(log_data['timestamp']).strftime(
-                '%Y-%m-%d %H:%M:%S'
-            )
-            
-            formatted_message = (
-                f"{timestamp} [{record.levelname}] "
-                f"[{log_data.get('module', 'unknown')}] "
-                f"{log_data['message']}\n"
-            )
-            
-            if log_data.get('exception'):
-                formatted_message += f"Exception: {log_data['exception']}\n"
-            
-            self.handler.emit(logging.LogRecord(
-                name=record.name,
-                level=record.levelno,
-                pathname=record.pathname,
-                lineno=record.lineno,
-                msg=formatted_message.strip(),
-                args=(),
-                exc_info=None
-            ))
-            
-        except (json.JSONDecodeError, Exception) as e:
+            # 直接序列化 log_data，不再经过格式化文本和新建 LogRecord
+            self.handler.write_line(_json_text(log_data))
+        except Exception:
             self.handler.emit(record)
+    
+    def flush(self):
+        self.handler.flush_buffer()
+    
+    def close(self):
+        self.handler.close()
+        super().close()
 
 
 def monitor_endpoint_performance(func):
     """监控端点性能的装饰器"""
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             result = await func(*args, **kwargs)
             
             # 记录性能指标
-            response_time = (time.time() - start_time) * 1000  # 转换为毫秒
+            response_time = (time.perf_counter() - start_time) * 1000  # 转换为毫秒
             
             if hasattr(wrapper, 'enterprise_logger'):
-                wrapper.enterprise_logger.collect_performance_metrics()
-                if wrapper.enterprise_logger.performance_metrics:
-                    wrapper.enterprise_logger.performance_metrics[-1].response_time = response_time
-                    wrapper.enterprise_logger.performance_metrics[-1].endpoint = func.__name__
+                # 系统指标由后台任务采集，请求路径只记录响应时间
+                wrapper.enterprise_logger.start_metrics_collection()
+                wrapper.enterprise_logger.record_response_time(func.__name__, response_time)
             
             return result
             
         except Exception as e:
-            response_time = (time.time() - start_time) * 1000
+            response_time = (time.perf_counter() - start_time) * 1000
             
             if hasattr(wrapper, 'enterprise_logger'):
                 wrapper.enterprise_logger.log_structured(
@@ -4,7 +4,13 @@
 统一错误分类和日志管理
 """
 
+import asyncio
+import configparser
 import logging
+import re
+import socket
+import sqlite3
+import time
 import traceback
 import functools
 from typing import Callable, Any, Optional
@@ -132,6 +138,32 @@ class LoggerManager:
 # 全局日志实例
 logger = LoggerManager()
 
+# 按异常类型归类，优先于消息关键字匹配
+_ERROR_TYPE_MAP = (
+    (sqlite3.Error, DatabaseError),
+    ((ConnectionError, socket.gaierror, socket.timeout), NetworkError),
+    (configparser.Error, ConfigError),
+)
+
+# 按消息关键字归类（忽略大小写，按顺序匹配）
+_ERROR_KEYWORD_MAP = (
+    (re.compile(r'database|sqlite', re.I), DatabaseError),
+    (re.compile(r'network|connection', re.I), NetworkError),
+    (re.compile(r'config', re.I), ConfigError),
+)
+
+
+def _classify_error(e: Exception) -> TokenMonitorError:
+    """将任意异常归类为 TokenMonitorError 子类"""
+    message = str(e)
+    for types, error_cls in _ERROR_TYPE_MAP:
+        if isinstance(e, types):
+            return error_cls(message)
+    for pattern, error_cls in _ERROR_KEYWORD_MAP:
+        if pattern.search(message):
+            return error_cls(message)
+    return TokenMonitorError(message)
+
 
 def error_handler(error_type: type = None, default_return: Any = None, log_error: bool = True):
     """错误处理装饰器"""
@@ -146,14 +178,8 @@ def error_handler(error_type: type = None, default_return: Any = None, log_error
                     classified_error = e
                 elif isinstance(e, TokenMonitorError):
                     classified_error = e
-                elif "database" in str(e).lower() or "sqlite" in str(e).lower():
-                    classified_error = DatabaseError(str(e))
-                elif "network" in str(e).lower() or "connection" in str(e).lower():
-                    classified_error = NetworkError(str(e))
-                elif "config" in str(e).lower():
-                    classified_error = ConfigError(str(e))
                 else:
-                    classified_error = TokenMonitorError(str(e))
+                    classified_error = _classify_error(e)
                 
                 # 记录错误
                 if log_error:
@@ -189,8 +215,46 @@ class ErrorRecovery:
     
     @staticmethod
     def retry(max_attempts: int = 3, delay: float = 1.0, backoff_factor: float = 2.0):
-        """重试装饰器"""
+        """重试装饰器，同时支持同步函数和协程函数（协程使用 asyncio.sleep 等待）"""
+        # 预先计算各次重试前的等待时间
+        delays = tuple(delay * backoff_factor ** attempt for attempt in range(max_attempts - 1))
+        
         def decorator(func: Callable) -> Callable:
+            def log_retry(attempt: int, e: Exception):
+                logger.warning(
+                    f"第 {attempt + 1} 次尝试失败，{delays[attempt]:.1f}秒后重试",
+                    exception=e,
+                    function=func.__name__,
+                    attempt=attempt + 1
+                )
+            
+            def log_failure(e: Exception):
+                logger.error(
+                    f"函数 {func.__name__} 重试 {max_attempts} 次后仍然失败",
+                    exception=e
+                )
+            
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    last_exception = None
+                    
+                    for attempt in range(max_attempts):
+                        try:
+                            return await func(*args, **kwargs)
+                        except Exception as e:
+                            last_exception = e
+                            
+                            if attempt < max_attempts - 1:
+                                log_retry(attempt, e)
+                                await asyncio.sleep(delays[attempt])
+                            else:
+                                log_failure(last_exception)
+                    
+                    raise last_exception
+                
+                return async_wrapper
+            
             @functools.wraps(func)
             def wrapper(*args, **kwargs):
                 last_exception = None
@@ -202,19 +266,10 @@ class ErrorRecovery:
                         last_exception = e
                         
                         if attempt < max_attempts - 1:
-                            logger.warning(
-                                f"第 {attempt + 1} 次尝试失败，{delay * (backoff_factor ** attempt):.1f}秒后重试",
-                                exception=e,
-                                function=func.__name__,
-                                attempt=attempt + 1
-                            )
-                            import time
-                            time.sleep(delay * (backoff_factor ** attempt))
+                            log_retry(attempt, e)
+                            time.sleep(delays[attempt])
                         else:
-                            logger.error(
-                                f"函数 {func.__name__} 重试 {max_attempts} 次后仍然失败",
-                                exception=last_exception
-                            )
+                            log_failure(last_exception)
                 
                 raise last_exception
             
@@ -270,60 +325,99 @@ class HealthChecker:
             'last_latency': 0
         })
     
-    def run_checks(self) -> dict:
-        """运行所有健康检查"""
-        results = {
+    def _new_results(self) -> dict:
+        """初始化检查结果"""
+        return {
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
             'checks': {},
             'failed_critical': 0,
             'degraded_count': 0
         }
+    
+    def _record_result(self, results: dict, check: dict, check_result: Any, latency_ms: float):
+        """记录单个检查的结果并更新整体状态"""
+        # 支持返回 (result, latency) 元组
+        if isinstance(check_result, tuple):
+            check_result, custom_latency = check_result
+            latency_ms = custom_latency
+        
+        check['last_result'] = check_result
+        check['last_check'] = datetime.now()
+        check['last_latency'] = latency_ms
+        
+        # 判断状态
+        if not check_result:
+            status = 'fail'
+            if check['critical']:
+                results['status'] = 'unhealthy'
+                results['failed_critical'] += 1
+        elif check['threshold_ms'] > 0 and latency_ms > check['threshold_ms']:
+            status = 'degraded'
+            if results['status'] == 'healthy':
+                results['status'] = 'degraded'
+            results['degraded_count'] += 1
+        else:
+            status = 'pass'
+        
+        results['checks'][check['name']] = {
+            'status': status,
+            'message': 'OK' if status == 'pass' else f'Latency: {latency_ms:.0f}ms' if status == 'degraded' else 'Check failed',
+            'latency_ms': latency_ms
+        }
+    
+    def _record_error(self, results: dict, check: dict, e: Exception):
+        """记录检查异常"""
+        logger.error(f"健康检查失败: {check['name']}", exception=e)
+        results['checks'][check['name']] = {
+            'status': 'error',
+            'message': str(e)
+        }
+        
+        if check['critical']:
+            results['status'] = 'unhealthy'
+            results['failed_critical'] += 1
+    
+    def run_checks(self) -> dict:
+        """运行所有健康检查"""
+        results = self._new_results()
         
         for check in self.checks:
             try:
-                start_time = datetime.now()
+                start_time = time.perf_counter()
                 check_result = check['func']()
-                latency_ms = (datetime.now() - start_time).total_seconds() * 1000
-                
-                # 支持返回 (result, latency) 元组
-                if isinstance(check_result, tuple):
-                    check_result, custom_latency = check_result
-                    latency_ms = custom_latency
-                
-                check['last_result'] = check_result
-                check['last_check'] = datetime.now()
-                check['last_latency'] = latency_ms
-                
-                # 判断状态
-                if not check_result:
-                    status = 'fail'
-                    if check['critical']:
-                        results['status'] = 'unhealthy'
-                        results['failed_critical'] += 1
-                elif check['threshold_ms'] > 0 and latency_ms > check['threshold_ms']:
-                    status = 'degraded'
-                    if results['status'] == 'healthy':
-                        results['status'] = 'degraded'
-                    results['degraded_count'] += 1
-                else:
-                    status = 'pass'
-                
-                results['checks'][check['name']] = {
-                    'status': status,
-                    'message': 'OK' if status == 'pass' else f'Latency: {latency_ms:.0f}ms' if status == 'degraded' else 'Check failed',
-                    'latency_ms': latency_ms
-                }
-                
+                latency_ms = (time.perf_counter() - start_time) * 1000
+                self._record_result(results, check, check_result, latency_ms)
             except Exception as e:
-                logger.error(f"健康检查失败: {check['name']}", exception=e)
-                results['checks'][check['name']] = {
-                    'status': 'error',
-                    'message': str(e)
-                }
-                
-                if check['critical']:
-                    results['status'] = 'unhealthy'
-                    results['failed_critical'] += 1
+                self._record_error(results, check, e)
+        
+        return results
+    
+    async def _run_check_async(self, check: dict):
+        """运行单个检查，同步检查放入线程池执行，返回 (结果, 延迟毫秒)"""
+        start_time = time.perf_counter()
+        if asyncio.iscoroutinefunction(check['func']):
+            check_result = await check['func']()
+        else:
+            loop = asyncio.get_running_loop()
+            check_result = await loop.run_in_executor(None, check['func'])
+        return check_result, (time.perf_counter() - start_time) * 1000
+    
+    async def run_checks_async(self) -> dict:
+        """并发运行所有健康检查，总耗时取决于最慢的检查"""
+        results = self._new_results()
+        
+        outcomes = await asyncio.gather(
+            *[self._run_check_async(check) for check in self.checks],
+            return_exceptions=True
+        )
+        
+        for check, outcome in zip(self.checks, outcomes):
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                self._record_result(results, check, *outcome)
+            except Exception as e:
+                self._record_error(results, check, e)
         
-        return results
\ No newline at end of file
+        return results
@@ -7,8 +7,17 @@
 
 import datetime
 import random
+from bisect import bisect
+from collections import Counter
+from itertools import accumulate
+from operator import itemgetter
 from typing import Dict, Any, List, Optional
 
+from usage_store import UsageRow
+
+# 历史数据成功率（原权重 success:failed = 285:5），随机数不低于该值时记为失败
+_HISTORY_SUCCESS_P = 285 / 290
+
 class DataGenerator:
     """数据生成器类"""
     
@@ -21,8 +30,8 @@ class DataGenerator:
             use_config_prices: 是否使用配置文件中的价格。默认True。
         """
         self.seed = seed
-        if seed is not None:
-            random.seed(seed)
+        # 独立的随机数生成器，不影响也不受进程内其他模块对全局 random 的使用
+        self._rng = random.Random(seed)
         
         # 默认价格
         default_prices = {
@@ -55,65 +64,82 @@ class DataGenerator:
             {"name": "gemini-2.5-pro", "tokens": 1200, "weight": 2, "type": "free"},
             {"name": "gemini-3-pro", "tokens": 2000, "weight": 1, "type": "paid"}
         ]
+        
+        # 模拟响应时间基准（与模型复杂度相关）
+        base_response_time = {
+            "gemini-2.0-flash": 120,
+            "gemini-2.5-flash": 180,
+            "gemini-2.5-pro": 300,
+            "gemini-3-pro": 450
+        }
+        # 展示名（如 gemini-2.5-pro -> 2.5 PRO）、单价和响应时间基准预先写入模型条目，
+        # 生成时只需一次字典取值
+        for m in self.models:
+            m["display"] = m["name"].replace("gemini-", "").replace("-", " ").upper()
+            m["price"] = self.cost_per_token[m["name"]]
+            m["base_rt"] = base_response_time[m["name"]]
+        self._models_tuple = tuple(self.models)
+        
+        # 各场景的模型累计权重，抽样时不再重复累加
+        self._cum_work = list(accumulate([2, 3, 2, 1]))      # 工作时间：付费模型权重更高
+        self._cum_off = list(accumulate([4, 3, 2, 1]))       # 非工作时间：更多使用免费模型
+        self._cum_weekend = list(accumulate([3, 4, 2, 1]))   # 周末
+        self._cum_weekday = self._cum_off                    # 工作日
     
     def generate_historical_data(self, days: int = 30) -> List[Dict[str, Any]]:
         """生成历史数据"""
+        return [row._asdict() for row in self.generate_historical_rows(days)]
+    
+    def generate_historical_rows(self, days: int = 30) -> List[UsageRow]:
+        """生成历史数据（UsageRow 元组，可直接写入 UsageStore，不经过字典）"""
         print(f"📊 生成过去{days}天的历史数据...")
         data = []
         now = datetime.datetime.now()
         
-        for days_ago in range(days, 0, -1):
-            current_date = now - datetime.timedelta(days=days_ago)
-            
-            # 动态生成每天记录数量（越近的日期记录越多）
-            base_records = max(1, min(8, int((days - days_ago) / 3) + 2))
+        # 动态生成每天记录数量（越近的日期记录越多）
+        day_range = range(days, 0, -1)
+        daily_counts = [max(1, min(8, int((days - days_ago) / 3) + 2)) for days_ago in day_range]
+        total = sum(daily_counts)
+        
+        # 随机量按总条数一次性批量抽取，不再逐条调用 randint/choices；
+        # 各天日期与 now 的时分秒相同，模型权重在整个批次内不变
+        choices = self._rng.choices
+        minutes = choices(range(60), k=total)
+        models = choices(self._models_tuple, cum_weights=self._model_cum_weights(now.hour), k=total)
+        token_variations = choices(range(-300, 501), k=total)
+        response_jitters = choices(range(-50, 101), k=total)
+        # 状态模拟（大部分成功，95%成功率）
+        rand = self._rng.random
+        statuses = ["failed" if rand() >= _HISTORY_SUCCESS_P else "success" for _ in range(total)]
+        draws = zip(minutes, models, token_variations, response_jitters, statuses)
+        
+        # 日期按序数推算，不再逐天构造 timedelta/datetime 并 strftime
+        today_ordinal = now.toordinal()
+        second = now.second
+        
+        for days_ago, base_records in zip(day_range, daily_counts):
+            day_prefix = datetime.date.fromordinal(today_ordinal - days_ago).isoformat()
             
-            for record_idx in range(base_records):
+            for record_idx, (minute, model, token_variation, jitter, status) in zip(range(base_records), draws):
                 # 生成时间分布（工作时间9:00-21:00）
                 hour = 9 + (record_idx * 4) % 13  # 避开深夜时间
-                minute = random.randint(0, 59)
                 
-                timestamp = current_date.replace(hour=hour, minute=minute).strftime("%Y-%m-%d %H:%M:%S")
-                
-                # 智能选择模型（根据真实使用模式）
-                model = self._smart_select_model(current_date.hour)
+                timestamp = f"{day_prefix} {hour:02d}:{minute:02d}:{second:02d}"
                 
                 # 添加随机变化
-                token_variation = random.randint(-300, 500)
                 tokens = max(50, model["tokens"] + token_variation)
                 
                 # 计算成本
-                cost = (tokens / 1000) * self.cost_per_token[model["name"]]
+                cost = (tokens / 1000) * model["price"]
                 
                 # 模拟响应时间（与模型复杂度相关）
-                base_response_time = {
-                    "gemini-2.0-flash": 120,
-                    "gemini-2.5-flash": 180,
-                    "gemini-2.5-pro": 300,
-                    "gemini-3-pro": 450
-                }
-                
-                response_time = base_response_time[model["name"]] + random.randint(-50, 100)
+                response_time = model["base_rt"] + jitter
                 
-                # 状态模拟（大部分成功）
-                status = random.choices(
-                    ["success", "success", "success", "failed"], 
-                    weights=[95, 95, 95, 5]  # 95%成功率
-                )[0]
-                
-                data.append({
-                    "timestamp": timestamp,
-                    "model_name": model["name"],
-                    "model": model["name"].replace("gemini-", "").replace("-", " ").upper(),
-                    "tokens_used": tokens,
-                    "tokens": tokens,
-                    "cost": round(cost, 4),
-                    "provider": "google",
-                    "session_id": f"historical_{days_ago}_{record_idx}",
-                    "type": model["type"],
-                    "responseTime": response_time,
-                    "status": status
-                })
+                data.append(UsageRow(
+                    timestamp, model["name"], model["display"], tokens, tokens, round(cost, 4),
+                    "google", f"historical_{days_ago}_{record_idx}", model["type"],
+                    response_time, status
+                ))
         
         print(f"✅ 已生成 {len(data)} 条历史数据")
         return data
@@ -148,28 +174,22 @@ class DataGenerator:
             }
         ]
         
+        day_prefix = now.strftime("%Y-%m-%d")
         for i, scenario in enumerate(today_scenarios[:records_count]):
-            timestamp = now.replace(
-                hour=scenario["hour"], 
-                minute=scenario["minute"]
-            ).strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = f"{day_prefix} {scenario['hour']:02d}:{scenario['minute']:02d}:{now.second:02d}"
             
             model = next(m for m in self.models if m["name"] == scenario["model"])
             
             # 计算成本
-            cost = (scenario["tokens"] / 1000) * self.cost_per_token[model["name"]]
+            cost = (scenario["tokens"] / 1000) * model["price"]
             
             # 响应时间基于场景调整
-            base_time = {
-                "gemini-2.0-flash": 120, "gemini-2.5-flash": 180,
-                "gemini-2.5-pro": 300, "gemini-3-pro": 450
-            }
-            response_time = base_time[model["name"]] + random.randint(-30, 60)
+            response_time = model["base_rt"] + self._rng.randint(-30, 60)
             
             data.append({
                 "timestamp": timestamp,
                 "model_name": model["name"],
-                "model": model["name"].replace("gemini-", "").replace("-", " ").upper(),
+                "model": model["display"],
                 "tokens_used": scenario["tokens"],
                 "tokens": scenario["tokens"],
                 "cost": round(cost, 4),
@@ -184,20 +204,22 @@ class DataGenerator:
         print(f"✅ 已生成今日{len(data)}条数据")
         return data
     
+    def _model_cum_weights(self, hour: int) -> List[int]:
+        """根据时间确定模型累计权重"""
+        # 工作时间更可能使用复杂模型
+        return self._cum_work if 9 <= hour <= 17 else self._cum_off
+    
     def _smart_select_model(self, hour: int) -> Dict[str, Any]:
         """根据时间智能选择模型"""
-        # 工作时间更可能使用复杂模型
-        if 9 <= hour <= 17:
-            # 工作时间：有更高概率使用付费模型
-            weights = [2, 3, 2, 1]  # 付费模型权重更高
-        else:
-            # 非工作时间：更多使用免费模型
-            weights = [4, 3, 2, 1]
-        
-        return random.choices(self.models, weights=weights)[0]
+        cum_weights = self._model_cum_weights(hour)
+        return self._models_tuple[bisect(cum_weights, self._rng.random() * cum_weights[-1])]
     
     def generate_realistic_data(self, total_records: int = 200) -> List[Dict[str, Any]]:
         """生成真实感的数据（内存优化版）"""
+        return [row._asdict() for row in self.generate_realistic_rows(total_records)]
+    
+    def generate_realistic_rows(self, total_records: int = 200) -> List[UsageRow]:
+        """生成真实感的数据（UsageRow 元组）"""
         print(f"📊 生成{total_records}条真实感数据...")
         now = datetime.datetime.now()
         
@@ -205,97 +227,85 @@ class DataGenerator:
         # 假设每天最多8条记录，根据total_records计算需要的天数
         max_days_needed = min(90, (total_records // 3) + 10)
         
-        data = []
+        # 先按时间顺序确定每条记录的日期和时分，再批量抽取其余随机量
+        slots = []
+        today_ordinal = now.toordinal()
+        rand, randint, choice, choices = self._rng.random, self._rng.randint, self._rng.choice, self._rng.choices
         
         # 只生成需要的天数范围
         for days_ago in range(max_days_needed, 0, -1):
-            if len(data) >= total_records:
+            if len(slots) >= total_records:
                 break
                 
-            current_date = now - datetime.timedelta(days=days_ago)
+            current_date = datetime.date.fromordinal(today_ordinal - days_ago)
+            # 周期模式
+            weekend = current_date.weekday() >= 5
+            day_prefix = current_date.isoformat()
             
             # 每天随机生成0-8条记录
-            daily_records = random.randint(0, 8)
+            daily_records = min(randint(0, 8), total_records - len(slots))
             
-            for i in range(daily_records):
-                if len(data) >= total_records:
-                    break
-                    
-                # 智能时间分布
-                if 6 <= i <= 8:
-                    hour = 9 + i  # 9:00-17:00
-                else:
-                    hour = random.choice([19, 20, 21])
-                
-                timestamp = current_date.replace(hour=hour, minute=random.randint(0, 59))
-                
-                # 周期模式
-                if current_date.weekday() >= 5:
-                    weights = [3, 4, 2, 1]
-                else:
-                    weights = [4, 3, 2, 1]
-                
-                model = random.choices(self.models, weights=weights)[0]
-                
-                # 错误重试模式
-                if random.random() < 0.1:
-                    tokens = random.randint(100, 500)
-                    response_time = random.randint(1000, 3000)
-                    status = "failed"
-                else:
-                    token_variation = random.randint(-200, 800)
-                    tokens = max(50, model["tokens"] + token_variation)
-                    base_time = {
-                        "gemini-2.0-flash": 120, "gemini-2.5-flash": 180,
-                        "gemini-2.5-pro": 300, "gemini-3-pro": 450
-                    }
-                    response_time = base_time[model["name"]] + random.randint(-50, 200)
-                    status = "success"
-                
-                cost = (tokens / 1000) * self.cost_per_token[model["name"]]
-                
-                data.append({
-                    "timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                    "model_name": model["name"],
-                    "model": model["name"].replace("gemini-", "").replace("-", " ").upper(),
-                    "tokens_used": tokens,
-                    "tokens": tokens,
-                    "cost": round(cost, 4),
-                    "provider": "google",
-                    "session_id": f"realistic_{days_ago}_{i}",
-                    "type": model["type"],
-                    "responseTime": response_time,
-                    "status": status
-                })
+            # 智能时间分布
+            hours = [
+                9 + i if 6 <= i <= 8 else choice([19, 20, 21])  # 9:00-17:00 或晚间
+                for i in range(daily_records)
+            ]
+            minutes = choices(range(60), k=daily_records)
+            
+            # 日内按时分排序（至多8条），各天按日期先后生成，整体无需再排序
+            for hour, minute, i in sorted(zip(hours, minutes, range(daily_records))):
+                slots.append((days_ago, i, day_prefix, hour, minute, weekend))
         
-        # 按时间排序
-        data.sort(key=lambda x: x["timestamp"], reverse=False)
+        count = len(slots)
+        weekend_count = sum(slot[5] for slot in slots)
+        weekend_models = iter(choices(self._models_tuple, cum_weights=self._cum_weekend, k=weekend_count))
+        weekday_models = iter(choices(self._models_tuple, cum_weights=self._cum_weekday, k=count - weekend_count))
+        # 错误重试模式（10%）
+        failures = [rand() < 0.1 for _ in range(count)]
+        failed_count = sum(failures)
+        failed_tokens = iter(choices(range(100, 501), k=failed_count))
+        failed_response_times = iter(choices(range(1000, 3001), k=failed_count))
+        token_variations = iter(choices(range(-200, 801), k=count - failed_count))
+        response_jitters = iter(choices(range(-50, 201), k=count - failed_count))
+        
+        # 各日期与 now 的秒数相同，时间戳直接拼接，不再逐条 replace + strftime
+        second = now.second
+        data = []
+        for (days_ago, i, day_prefix, hour, minute, weekend), failed in zip(slots, failures):
+            model = next(weekend_models if weekend else weekday_models)
+            
+            if failed:
+                tokens = next(failed_tokens)
+                response_time = next(failed_response_times)
+                status = "failed"
+            else:
+                token_variation = next(token_variations)
+                tokens = max(50, model["tokens"] + token_variation)
+                response_time = model["base_rt"] + next(response_jitters)
+                status = "success"
+            
+            cost = (tokens / 1000) * model["price"]
+            
+            data.append(UsageRow(
+                f"{day_prefix} {hour:02d}:{minute:02d}:{second:02d}", model["name"], model["display"],
+                tokens, tokens, round(cost, 4), "google", f"realistic_{days_ago}_{i}",
+                model["type"], response_time, status
+            ))
         
         print(f"✅ 已生成{len(data)}条真实感数据")
-        return data[:total_records]
+        return data
     
     def get_data_summary(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """获取数据摘要"""
         if not data:
             return {"total_records": 0}
         
-        total_tokens = sum(item["tokens"] for item in data)
-        total_cost = sum(item["cost"] for item in data)
-        model_stats = {}
-        provider_stats = {}
-        
-        for item in data:
-            model = item["model_name"]
-            model_stats[model] = model_stats.get(model, 0) + 1
-            
-            provider = item["provider"]
-            provider_stats[provider] = provider_stats.get(provider, 0) + 1
-        
+        # 各指标分别用 C 层归约（sum/Counter + itemgetter），实测快于单次 Python 循环同时累加
         return {
             "total_records": len(data),
-            "total_tokens": total_tokens,
-            "total_cost": total_cost,
-            "model_stats": model_stats,
-            "provider_stats": provider_stats,
+            "total_tokens": sum(map(itemgetter("tokens"), data)),
+            "total_cost": sum(map(itemgetter("cost"), data)),
+            "model_stats": dict(Counter(map(itemgetter("model_name"), data))),
+            "provider_stats": dict(Counter(map(itemgetter("provider"), data))),
             "date_range": f"{data[-1]['timestamp'][:10]} 至 {data[0]['timestamp'][:10]}" if data else "N/A"
         }
\ No newline at end of file
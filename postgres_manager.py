@@ -6,16 +6,141 @@ PostgreSQL数据库管理器
 
 import asyncio
 import asyncpg
+import datetime
 import logging
+import time
 from typing import Optional, List, Dict, Any
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
+from functools import lru_cache
 
 from config_manager import config
 from data_models import TokenUsage
 from error_handling import DatabaseError
 
 
+# token_usage 写入列，顺序与 _usage_values 一致
+_INSERT_COLUMNS = (
+    'model_name', 'model_type', 'tokens_used', 'cost', 'response_time', 'status',
+    'api_provider', 'request_type', 'user_id', 'session_id', 'agent_name', 'category'
+)
+
+_INSERT_SQL = (
+    f"INSERT INTO token_usage ({', '.join(_INSERT_COLUMNS)}) "
+    f"VALUES ({', '.join(f'${i}' for i in range(1, len(_INSERT_COLUMNS) + 1))})"
+)
+
+
+# 查询列，顺序与 TokenUsage 字段一致，结果按位置构造
+_SELECT_COLUMNS = ', '.join(('id', 'timestamp') + _INSERT_COLUMNS)
+
+
+# 时间范围条件，均为 timestamp 上的区间比较，可走 idx_token_usage_timestamp 范围扫描
+# （DATE(timestamp) = CURRENT_DATE 对列套函数，只能全表扫描）
+_TIME_RANGE_CONDITIONS = {
+    'day': "timestamp >= CURRENT_DATE AND timestamp < CURRENT_DATE + 1",
+    'week': "timestamp >= CURRENT_DATE - INTERVAL '7 days'",
+    'month': "timestamp >= CURRENT_DATE - INTERVAL '30 days'",
+    'year': "timestamp >= CURRENT_DATE - INTERVAL '365 days'",
+}
+
+
+# 统计查询按时间范围预先生成，None 为不限时间；
+# 读取按天汇总的 daily_summary（由 token_usage 上的触发器维护），扫描量与天数而非记录数相关
+_STATS_SQL = {
+    time_range: f'''
+        SELECT 
+            SUM(total_calls) as total_calls,
+            SUM(total_tokens) as total_tokens,
+            SUM(total_cost) as total_cost,
+            SUM(paid_calls) as paid_calls,
+            SUM(free_calls) as free_calls,
+            SUM(paid_tokens) as paid_tokens,
+            SUM(free_tokens) as free_tokens
+        FROM daily_summary 
+        WHERE {condition}
+    '''
+    for time_range, condition in (
+        ('day', "date = CURRENT_DATE"),
+        ('week', "date >= CURRENT_DATE - 7"),
+        ('month', "date >= CURRENT_DATE - 30"),
+        (None, "1=1"),
+    )
+}
+
+
+# daily_summary 的汇总表达式，rows 为 token_usage 记录集合（触发器的新增行或全表回填）
+_DAILY_ROLLUP_SELECT = '''
+    SELECT 
+        timestamp::date,
+        SUM(tokens_used),
+        SUM(cost),
+        COUNT(*),
+        SUM(CASE WHEN model_type = 'free' THEN tokens_used ELSE 0 END),
+        SUM(CASE WHEN model_type = 'paid' THEN tokens_used ELSE 0 END),
+        COUNT(CASE WHEN model_type = 'paid' THEN 1 END),
+        COUNT(CASE WHEN model_type = 'free' THEN 1 END)
+    FROM {rows}
+    GROUP BY timestamp::date
+'''
+
+_DAILY_ROLLUP_COLUMNS = (
+    "date, total_tokens, total_cost, total_calls, free_tokens, paid_tokens, paid_calls, free_calls"
+)
+
+
+def _as_date(value: Any) -> Optional[datetime.date]:
+    """日期过滤值转换为 date（接受 YYYY-MM-DD 字符串），空值返回 None"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    return value
+
+
+# get_usage_data 的参数化过滤条件：(过滤键, 条件模板, 取值函数)，取值为 None 时不启用
+_USAGE_FILTERS = (
+    ('modelType', "model_type = ${}", lambda v: v if v and v != 'all' else None),
+    ('specificModel', "model_name LIKE ${}", lambda v: f"%{v}%" if v and v != 'all' else None),
+    ('startDate', "timestamp >= ${}::date", _as_date),
+    ('endDate', "timestamp < ${}::date + 1", _as_date),
+)
+
+
+@lru_cache(maxsize=128)
+def _usage_query(time_range: Optional[str], active: tuple) -> str:
+    """按过滤形状（时间范围 + 启用的过滤条件序号）生成查询，同一形状复用同一 SQL 文本"""
+    where_conditions = [_TIME_RANGE_CONDITIONS[time_range]] if time_range else []
+    where_conditions.extend(
+        _USAGE_FILTERS[index][1].format(param) for param, index in enumerate(active, 1)
+    )
+    where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
+    return f'''
+        SELECT {_SELECT_COLUMNS} FROM token_usage 
+        WHERE {where_clause}
+        ORDER BY timestamp DESC
+        LIMIT ${len(active) + 1}
+    '''
+
+
+def _usage_values(token_usage: TokenUsage) -> tuple:
+    """TokenUsage 转换为按 _INSERT_COLUMNS 排列的写入值"""
+    return (
+        token_usage.model_name,
+        token_usage.model_type,
+        token_usage.tokens_used,
+        float(token_usage.cost),
+        token_usage.response_time,
+        token_usage.status,
+        token_usage.api_provider,
+        token_usage.request_type,
+        token_usage.user_id,
+        token_usage.session_id,
+        token_usage.agent_name,
+        token_usage.category
+    )
+
+
 @dataclass
 class DatabaseConfig:
     """数据库配置"""
@@ -29,31 +154,52 @@ class DatabaseConfig:
     command_timeout: int = 60
 
 
+class _UsageConnection(asyncpg.Connection):
+    """连接池连接，新建时由 PostgreSQLManager._on_connect 预编译固定的热点语句"""
+    insert_statement = None
+    stats_statements = None
+
+
 class PostgreSQLManager:
     """PostgreSQL数据库管理器 - 企业级数据库解决方案"""
     
     def __init__(self, config: DatabaseConfig):
         self.config = config
         self.pool = None
-        self._lock = asyncio.Lock()
+        # 仅保护连接池的一次性初始化，连接获取由连接池自身保证并发安全
+        self._init_lock = asyncio.Lock()
     
     async def initialize(self):
         """初始化连接池"""
         try:
-            self.pool = await asyncpg.create_pool(
+            connect_args = dict(
                 host=self.config.host,
                 port=self.config.port,
                 database=self.config.database,
                 user=self.config.username,
                 password=self.config.password,
-                min_size=self.config.pool_min_size,
-                max_size=self.config.pool_max_size,
                 command_timeout=self.config.command_timeout,
-                ssl='disable'
+                ssl='disable',
+                # 短查询为主，关闭 JIT；作为启动参数设置，连接归还时的 RESET ALL 不会清除
+                server_settings={'jit': 'off'}
             )
             
-            # 创建必要的表
-            await self._create_tables()
+            # 先创建必要的表，连接池中的连接建立时即可预编译语句
+            conn = await asyncpg.connect(**connect_args)
+            try:
+                await self._create_tables(conn)
+            finally:
+                await conn.close()
+            
+            self.pool = await asyncpg.create_pool(
+                min_size=self.config.pool_min_size,
+                max_size=self.config.pool_max_size,
+                connection_class=_UsageConnection,
+                init=self._on_connect,
+                # 语句集合固定，缓存的预编译语句不过期
+                max_cached_statement_lifetime=0,
+                **connect_args
+            )
             
             logging.info("PostgreSQL连接池初始化成功")
             
@@ -61,46 +207,109 @@ class PostgreSQLManager:
             logging.error(f"数据库连接池初始化失败: {e}")
             raise DatabaseError(f"Failed to initialize database: {e}")
     
-    async def _create_tables(self):
+    async def _on_connect(self, conn: _UsageConnection):
+        """连接池新建连接时预编译写入和统计语句，请求路径上不再解析和推导类型"""
+        conn.insert_statement = await conn.prepare(_INSERT_SQL)
+        conn.stats_statements = {
+            time_range: await conn.prepare(sql) for time_range, sql in _STATS_SQL.items()
+        }
+    
+    async def _create_tables(self, conn):
         """创建数据库表"""
-        async with self.pool.acquire() as conn:
-            # 创建token_usage表
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS token_usage (
-                    id SERIAL PRIMARY KEY,
-                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                    model_name VARCHAR(255) NOT NULL,
-                    model_type VARCHAR(50) NOT NULL,
-                    tokens_used INTEGER NOT NULL,
-                    cost DECIMAL(10,4) NOT NULL,
-                    response_time INTEGER,
-                    status VARCHAR(50) DEFAULT 'success',
-                    api_provider VARCHAR(100),
-                    request_type VARCHAR(100),
-                    user_id VARCHAR(100) DEFAULT 'default',
-                    session_id VARCHAR(255),
-                    agent_name VARCHAR(255),
-                    category VARCHAR(100)
-                )
-            ''')
-            
-            # 创建daily_summary表
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS daily_summary (
-                    id SERIAL PRIMARY KEY,
-                    date DATE UNIQUE,
-                    total_tokens INTEGER DEFAULT 0,
-                    total_cost DECIMAL(12,4) DEFAULT 0.0000,
-                    total_calls INTEGER DEFAULT 0,
-                    free_tokens INTEGER DEFAULT 0,
-                    paid_tokens INTEGER DEFAULT 0
-                )
-            ''')
-            
-            # 创建索引
-            await self._create_indexes(conn)
-            
-            logging.info("数据库表创建完成")
+        # 创建token_usage表
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS token_usage (
+                id SERIAL PRIMARY KEY,
+                timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                model_name VARCHAR(255) NOT NULL,
+                model_type VARCHAR(50) NOT NULL,
+                tokens_used INTEGER NOT NULL,
+                cost DECIMAL(10,4) NOT NULL,
+                response_time INTEGER,
+                status VARCHAR(50) DEFAULT 'success',
+                api_provider VARCHAR(100),
+                request_type VARCHAR(100),
+                user_id VARCHAR(100) DEFAULT 'default',
+                session_id VARCHAR(255),
+                agent_name VARCHAR(255),
+                category VARCHAR(100)
+            )
+        ''')
+        
+        # 创建daily_summary表
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS daily_summary (
+                id SERIAL PRIMARY KEY,
+                date DATE UNIQUE,
+                total_tokens BIGINT DEFAULT 0,
+                total_cost DECIMAL(12,4) DEFAULT 0.0000,
+                total_calls BIGINT DEFAULT 0,
+                free_tokens BIGINT DEFAULT 0,
+                paid_tokens BIGINT DEFAULT 0,
+                paid_calls BIGINT DEFAULT 0,
+                free_calls BIGINT DEFAULT 0
+            )
+        ''')
+        # 旧表补列并放宽为BIGINT：触发器累加的日汇总超出INTEGER范围会使写入token_usage失败
+        await conn.execute('''
+            ALTER TABLE daily_summary ADD COLUMN IF NOT EXISTS paid_calls BIGINT DEFAULT 0;
+            ALTER TABLE daily_summary ADD COLUMN IF NOT EXISTS free_calls BIGINT DEFAULT 0;
+            ALTER TABLE daily_summary
+                ALTER COLUMN total_tokens TYPE BIGINT,
+                ALTER COLUMN total_calls TYPE BIGINT,
+                ALTER COLUMN free_tokens TYPE BIGINT,
+                ALTER COLUMN paid_tokens TYPE BIGINT,
+                ALTER COLUMN paid_calls TYPE BIGINT,
+                ALTER COLUMN free_calls TYPE BIGINT;
+        ''')
+        
+        # 按天汇总由语句级触发器增量维护（COPY 批量写入也只汇总一次）
+        await self._create_daily_rollup(conn)
+        
+        # 创建索引
+        await self._create_indexes(conn)
+        
+        logging.info("数据库表创建完成")
+    
+    async def _create_daily_rollup(self, conn):
+        """创建 daily_summary 维护触发器；首次创建时按现有记录回填"""
+        await conn.execute(f'''
+            CREATE OR REPLACE FUNCTION token_usage_daily_rollup() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO daily_summary ({_DAILY_ROLLUP_COLUMNS})
+                {_DAILY_ROLLUP_SELECT.format(rows="new_rows")}
+                ON CONFLICT (date) DO UPDATE SET
+                    total_tokens = daily_summary.total_tokens + EXCLUDED.total_tokens,
+                    total_cost = daily_summary.total_cost + EXCLUDED.total_cost,
+                    total_calls = daily_summary.total_calls + EXCLUDED.total_calls,
+                    free_tokens = daily_summary.free_tokens + EXCLUDED.free_tokens,
+                    paid_tokens = daily_summary.paid_tokens + EXCLUDED.paid_tokens,
+                    paid_calls = daily_summary.paid_calls + EXCLUDED.paid_calls,
+                    free_calls = daily_summary.free_calls + EXCLUDED.free_calls;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        
+        # 加锁后检查并创建，回填与触发器生效之间不会漏掉并发写入
+        await conn.execute(f'''
+            DO $$
+            BEGIN
+                LOCK TABLE token_usage IN SHARE ROW EXCLUSIVE MODE;
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_trigger WHERE tgname = 'trg_token_usage_daily_rollup'
+                ) THEN
+                    DELETE FROM daily_summary;
+                    INSERT INTO daily_summary ({_DAILY_ROLLUP_COLUMNS})
+                    {_DAILY_ROLLUP_SELECT.format(rows="token_usage")};
+                    CREATE TRIGGER trg_token_usage_daily_rollup
+                        AFTER INSERT ON token_usage
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION token_usage_daily_rollup();
+                END IF;
+            END
+            $$
+        ''')
     
     async def _create_indexes(self, conn):
         """创建性能索引"""
@@ -109,7 +318,9 @@ class PostgreSQLManager:
             "CREATE INDEX IF NOT EXISTS idx_token_usage_model_type ON token_usage(model_type)",
             "CREATE INDEX IF NOT EXISTS idx_token_usage_timestamp_model ON token_usage(timestamp DESC, model_type)",
             "CREATE INDEX IF NOT EXISTS idx_token_usage_provider_model ON token_usage(api_provider, model_name)",
-            "CREATE INDEX IF NOT EXISTS idx_token_usage_user_session ON token_usage(user_id, session_id)"
+            "CREATE INDEX IF NOT EXISTS idx_token_usage_user_session ON token_usage(user_id, session_id)",
+            # get_stats 改读 daily_summary 后不再需要覆盖索引，只会拖慢写入
+            "DROP INDEX IF EXISTS idx_token_usage_timestamp_covering"
         ]
         
         for index_sql in indexes:
@@ -120,39 +331,19 @@ class PostgreSQLManager:
     @asynccontextmanager
     async def get_connection(self):
         """获取数据库连接的上下文管理器"""
-        async with self._lock:
-            if self.pool is None:
-                await self.initialize()
-            
-            conn = await self.pool.acquire()
-            try:
-                yield conn
-            finally:
-                await self.pool.release(conn)
+        if self.pool is None:
+            async with self._init_lock:
+                if self.pool is None:
+                    await self.initialize()
+        
+        async with self.pool.acquire() as conn:
+            yield conn
     
     async def insert_token_usage(self, token_usage: TokenUsage) -> bool:
         """异步插入Token使用记录"""
         try:
             async with self.get_connection() as conn:
-                await conn.execute('''
-                    INSERT INTO token_usage 
-                    (model_name, model_type, tokens_used, cost, response_time, status, 
-                     api_provider, request_type, user_id, session_id, agent_name, category)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                ''', (
-                    token_usage.model_name,
-                    token_usage.model_type,
-                    token_usage.tokens_used,
-                    float(token_usage.cost),
-                    token_usage.response_time,
-                    token_usage.status,
-                    token_usage.api_provider,
-                    token_usage.request_type,
-                    token_usage.user_id,
-                    token_usage.session_id,
-                    token_usage.agent_name,
-                    token_usage.category
-                ))
+                await conn.insert_statement.fetch(*_usage_values(token_usage))
             
             logging.info(f"成功插入Token使用记录: {token_usage.model_name}")
             return True
@@ -161,68 +352,61 @@ class PostgreSQLManager:
             logging.error(f"插入Token使用记录失败: {e}")
             return False
     
+    async def insert_token_usage_bulk(self, records: List[TokenUsage]) -> bool:
+        """批量插入Token使用记录（COPY协议，一次往返写入全部记录）"""
+        if not records:
+            return True
+        
+        try:
+            rows = [_usage_values(token_usage) for token_usage in records]
+            async with self.get_connection() as conn:
+                await conn.copy_records_to_table(
+                    'token_usage', records=rows, columns=_INSERT_COLUMNS
+                )
+            
+            logging.info(f"成功批量插入Token使用记录: {len(rows)} 条")
+            return True
+            
+        except Exception as e:
+            logging.error(f"批量插入Token使用记录失败: {e}")
+            return False
+    
     async def get_usage_data(self, filters: Optional[Dict[str, Any]] = None, limit: int = 100) -> List[TokenUsage]:
         """异步获取使用数据"""
         try:
-            where_conditions = []
+            time_range = None
+            active = []
             params = []
-            param_count = 1
             
             if filters is not None:
                 # 时间范围过滤
                 time_range = filters.get('timeRange', 'week')
-                if time_range == 'day':
-                    where_conditions.append(f"DATE(timestamp) = CURRENT_DATE")
-                elif time_range == 'week':
-                    where_conditions.append(f"timestamp >= CURRENT_DATE - INTERVAL '7 days'")
-                elif time_range == 'month':
-                    where_conditions.append(f"timestamp >= CURRENT_DATE - INTERVAL '30 days'")
-                elif time_range == 'year':
-                    where_conditions.append(f"timestamp >= CURRENT_DATE - INTERVAL '365 days'")
-                
-                # 模型类型过滤
-                model_type = filters.get('modelType')
-                if model_type and model_type != 'all':
-                    where_conditions.append(f"model_type = ${param_count}")
-                    params.append(model_type)
-                    param_count += 1
-                
-                # 具体模型过滤
-                specific_model = filters.get('specificModel')
-                if specific_model and specific_model != 'all':
-                    where_conditions.append(f"model_name LIKE ${param_count}")
-                    params.append(f"%{specific_model}%")
-                    param_count += 1
-                
-                # 日期范围过滤
-                start_date = filters.get('startDate')
-                if start_date:
-                    where_conditions.append(f"DATE(timestamp) >= ${param_count}")
-                    params.append(start_date)
-                    param_count += 1
+                if time_range not in _TIME_RANGE_CONDITIONS:
+                    time_range = None
                 
-                end_date = filters.get('endDate')
-                if end_date:
-                    where_conditions.append(f"DATE(timestamp) <= ${param_count}")
-                    params.append(end_date)
-                    param_count += 1
+                # 模型类型、具体模型、日期范围过滤
+                for index, (key, _, extract) in enumerate(_USAGE_FILTERS):
+                    value = extract(filters.get(key))
+                    if value is not None:
+                        active.append(index)
+                        params.append(value)
             
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
             params.append(limit)
             
             async with self.get_connection() as conn:
-                rows = await conn.fetch(f'''
-                    SELECT * FROM token_usage 
-                    WHERE {where_clause}
-                    ORDER BY timestamp DESC
-                    LIMIT ${param_count}
-                ''', *params)
+                rows = await conn.fetch(_usage_query(time_range, tuple(active)), *params)
                 
-                # 转换为TokenUsage对象
-                results = []
-                for row in rows:
-                    row_dict = dict(row)
-                    results.append(TokenUsage.from_dict(row_dict))
+                # 转换为TokenUsage对象：按列位置直接构造，不经过 dict(row) 和 from_dict
+                results = [
+                    TokenUsage(
+                        row_id, timestamp, model_name, model_type, tokens_used, float(cost),
+                        response_time, status, api_provider, request_type, user_id,
+                        session_id, agent_name, category
+                    )
+                    for (row_id, timestamp, model_name, model_type, tokens_used, cost,
+                         response_time, status, api_provider, request_type, user_id,
+                         session_id, agent_name, category) in rows
+                ]
                 
                 logging.info(f"获取到 {len(results)} 条记录")
                 return results
@@ -234,44 +418,24 @@ class PostgreSQLManager:
     async def get_stats(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """异步获取统计数据"""
         try:
-            where_conditions = []
-            params = []
-            param_count = 1
-            
-            if filters is not None:
-                time_range = filters.get('timeRange', 'week')
-                if time_range == 'day':
-                    where_conditions.append(f"DATE(timestamp) = CURRENT_DATE")
-                elif time_range == 'week':
-                    where_conditions.append(f"timestamp >= CURRENT_DATE - INTERVAL '7 days'")
-                elif time_range == 'month':
-                    where_conditions.append(f"timestamp >= CURRENT_DATE - INTERVAL '30 days'")
-            
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
+            time_range = filters.get('timeRange', 'week') if filters is not None else None
             
             async with self.get_connection() as conn:
-                row = await conn.fetchrow(f'''
-                    SELECT 
-                        COUNT(*) as total_calls,
-                        SUM(tokens_used) as total_tokens,
-                        SUM(cost) as total_cost,
-                        COUNT(CASE WHEN model_type = 'paid' THEN 1 END) as paid_calls,
-                        COUNT(CASE WHEN model_type = 'free' THEN 1 END) as free_calls,
-                        SUM(CASE WHEN model_type = 'paid' THEN tokens_used ELSE 0 END) as paid_tokens,
-                        SUM(CASE WHEN model_type = 'free' THEN tokens_used ELSE 0 END) as free_tokens
-                    FROM token_usage 
-                    WHERE {where_clause}
-                ''', *params)
+                # 各时间范围的统计语句已在连接建立时预编译
+                statements = conn.stats_statements
+                row = await statements.get(time_range, statements[None]).fetchrow()
                 
                 if row:
+                    # 按列位置读取，顺序与 _STATS_SQL 的选择列一致
+                    total_calls, total_tokens, total_cost, paid_calls, free_calls, paid_tokens, free_tokens = row
                     stats = {
-                        'total_calls': int(row['total_calls']),
-                        'total_tokens': int(row['total_tokens'] or 0),
-                        'total_cost': float(row['total_cost'] or 0),
-                        'paid_calls': int(row['paid_calls'] or 0),
-                        'free_calls': int(row['free_calls'] or 0),
-                        'paid_tokens': int(row['paid_tokens'] or 0),
-                        'free_tokens': int(row['free_tokens'] or 0)
+                        'total_calls': int(total_calls or 0),
+                        'total_tokens': int(total_tokens or 0),
+                        'total_cost': float(total_cost or 0),
+                        'paid_calls': int(paid_calls or 0),
+                        'free_calls': int(free_calls or 0),
+                        'paid_tokens': int(paid_tokens or 0),
+                        'free_tokens': int(free_tokens or 0)
                     }
                 else:
                     stats = {
@@ -307,7 +471,7 @@ class PostgreSQLManager:
                     "database": "postgresql",
                     "pool_size": pool_size,
                     "pool_free": pool_free,
-                    "timestamp": asyncio.get_event_loop().time()
+                    "timestamp": time.monotonic()
                 }
                 
         except Exception as e:
@@ -315,8 +479,24 @@ class PostgreSQLManager:
             return {
                 "status": "unhealthy",
                 "error": str(e),
-                "timestamp": asyncio.get_event_loop().time()
+                "timestamp": time.monotonic()
+            }
+    
+    def quick_health(self) -> Dict[str, Any]:
+        """轻量健康检查：只读取连接池状态，不占用连接、不做 I/O"""
+        if self.pool is None:
+            return {
+                "status": "unhealthy",
+                "error": "connection pool not initialized",
+                "timestamp": time.monotonic()
             }
+        return {
+            "status": "healthy",
+            "database": "postgresql",
+            "pool_size": self.pool.get_size(),
+            "pool_free": self.pool.get_idle_size(),
+            "timestamp": time.monotonic()
+        }
     
     async def close(self):
         """关闭连接池"""
@@ -4,46 +4,197 @@ Token使用量记录脚本
 用于记录OpenCode中各个API的Token使用情况
 """
 
+import atexit
+import csv
+import io
 import json
+import queue
 import sqlite3
+import threading
 import datetime
 import os
 import random
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
 from typing import Dict, List, Optional
 
+# 连接级PRAGMA: WAL读写互不阻塞，NORMAL同步减少fsync，写锁冲突时等待而非立即报错
+SQLITE_PRAGMAS = '''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA busy_timeout=5000;
+    PRAGMA cache_size=-20000;
+'''
+
+# 表结构与索引，init_database 以单个脚本执行；连接级PRAGMA由连接池在建立连接时设置
+# timestamp 与 data_models.DatabaseManager 一致，存Unix秒（两者共用同一数据库文件）
+_SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS token_usage (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+        model_name TEXT NOT NULL,
+        model_type TEXT NOT NULL,
+        tokens_used INTEGER NOT NULL,
+        cost REAL NOT NULL,
+        response_time INTEGER,
+        status TEXT DEFAULT 'success',
+        api_provider TEXT,
+        request_type TEXT,
+        user_id TEXT DEFAULT 'default'
+    );
+    
+    -- 按时间窗口统计走索引范围扫描，摘要用到的列都在索引中（覆盖索引），不再回表
+    CREATE INDEX IF NOT EXISTS idx_token_usage_summary_cover 
+    ON token_usage(timestamp, model_type, status, tokens_used, cost, response_time);
+    
+    -- 旧索引是上面索引的前缀，只会拖慢写入
+    DROP INDEX IF EXISTS idx_ts_type_status;
+'''
+
+# 一次性迁移（与 DatabaseManager 相同，按 user_version 判断）：旧库的UTC文本时间戳转换为Unix秒
+_MIGRATE_SQL = '''
+    UPDATE token_usage
+    SET timestamp = CAST(strftime('%s', timestamp) AS INTEGER)
+    WHERE typeof(timestamp) = 'text';
+    PRAGMA user_version = 1;
+'''
+
+# 时间窗口起点：N天前的0点（UTC，与原 DATE('now', '-N days') 相同）对应的Unix秒
+_SINCE_SQL = "CAST(strftime('%s', 'now', ?, 'start of day') AS INTEGER)"
+
+# 写入语句文本固定，池化连接的语句缓存可直接复用已编译的语句
+_RECORD_SQL = '''
+    INSERT INTO token_usage 
+    (model_name, model_type, tokens_used, cost, response_time, status, api_provider, request_type)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SIMULATE_SQL = '''
+    INSERT INTO token_usage 
+    (timestamp, model_name, model_type, tokens_used, cost, response_time, status, api_provider, request_type)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# 模型名 -> (模型类型, 提供商)
+_MODEL_INFO = {
+    # Claude模型
+    'claude-3-5-sonnet-20241022': ('paid', 'anthropic'),
+    'claude-3-haiku-20240307': ('paid', 'anthropic'),
+    
+    # OpenAI模型
+    'gpt-4o': ('paid', 'openai'),
+    'gpt-4o-mini': ('paid', 'openai'),
+    'gpt-3.5-turbo': ('paid', 'openai'),
+    
+    # Google模型
+    'gemini-2.5-flash': ('free', 'google'),
+    'gemini-2.5-pro': ('free', 'google'),
+    'gemini-2.0-flash-exp': ('free', 'google'),
+    'gemini-pro': ('free', 'google'),
+    
+    # MinMax模型
+    'MiniMax-M2.1': ('free', 'minimax'),
+    'MiniMax-M2.1-lightning': ('free', 'minimax'),
+    
+    # 智谱AI模型
+    'glm-4': ('free', 'zhipuai'),
+    'glm-4-turbo': ('free', 'zhipuai'),
+    'glm-3-turbo': ('free', 'zhipuai'),
+    
+    # DeepSeek模型
+    'deepseek-chat': ('free', 'deepseek'),
+    
+    # Mistral模型
+    'mistral-large-2402': ('paid', 'mistral'),
+    'mistral-tiny': ('paid', 'mistral'),
+    
+    # Cohere模型
+    'command-r-plus': ('paid', 'cohere'),
+    'command-light': ('paid', 'cohere'),
+}
+
+_UNKNOWN_MODEL_INFO = ('unknown', 'unknown')
+
+class _ConnectionPool:
+    """SQLite连接池：连接按需创建（至多size个）并复用，省去每次打开连接和设置PRAGMA"""
+    
+    def __init__(self, db_path: str, size: int = 5):
+        self.db_path = db_path
+        self.size = size
+        self._idle: queue.Queue = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库连接并应用PRAGMA"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.executescript(SQLITE_PRAGMAS)
+        return conn
+    
+    @contextmanager
+    def acquire(self):
+        """取出一个连接，用完归还；出错时回滚未提交的事务"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+    
+    def close(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
 class TokenUsageRecorder:
-    def __init__(self):
+    def __init__(self, db_path: Optional[str] = None):
         base_dir = Path(__file__).parent
-        self.db_path = str(base_dir / "token_usage.db")
+        self.db_path = db_path or str(base_dir / "token_usage.db")
         self.config_file = str(Path.home() / "LocalProjects/OpenCode/oh-my-opencode.json")
         self.env_file = str(Path.home() / ".config/opencode/.env")
-        
+        self._pool = _ConnectionPool(self.db_path)
+        atexit.register(self._pool.close)
+    
     def init_database(self):
         """初始化数据库"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS token_usage (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                model_name TEXT NOT NULL,
-                model_type TEXT NOT NULL,
-                tokens_used INTEGER NOT NULL,
-                cost REAL NOT NULL,
-                response_time INTEGER,
-                status TEXT DEFAULT 'success',
-                api_provider TEXT,
-                request_type TEXT,
-                user_id TEXT DEFAULT 'default'
+        with self._pool.acquire() as conn:
+            # 首次建索引后收集统计信息供查询规划使用
+            index_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_token_usage_summary_cover'"
+            ).fetchone() is not None
+            migrated = conn.execute('PRAGMA user_version').fetchone()[0] >= 1
+            # 建表、建索引、迁移在同一事务中完成
+            conn.executescript(
+                f"BEGIN; {_SCHEMA_SQL} {'' if migrated else _MIGRATE_SQL} "
+                f"{'' if index_exists else 'ANALYZE;'} COMMIT;"
             )
-        ''')
-        
-        conn.commit()
-        conn.close()
     
     def load_config(self) -> Dict:
         """加载OpenCode配置"""
@@ -58,70 +209,53 @@ class TokenUsageRecorder:
                         cost: float, response_time: int = 0,
                         status: str = 'success', request_type: str = 'chat'):
         """记录API使用情况"""
+        recorded = self.record_api_usage_batch([{
+            'model_name': model_name,
+            'tokens_used': tokens_used,
+            'cost': cost,
+            'response_time': response_time,
+            'status': status,
+            'request_type': request_type
+        }])
+        if recorded:
+            print(f"✅ 记录成功: {model_name} - {tokens_used} tokens - ¥{cost}")
+    
+    def record_api_usage_batch(self, records: List[Dict]) -> bool:
+        """批量记录API使用情况：一个连接、一次 executemany、一次提交
+        
+        每条记录需包含 model_name、tokens_used、cost，
+        可选 response_time（默认0）、status（默认success）、request_type（默认chat）。
+        """
+        if not records:
+            return True
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # 确定模型类型和提供商（每个模型只查一次）
+            model_info = {}
+            rows = []
+            for record in records:
+                model_name = record['model_name']
+                info = model_info.get(model_name)
+                if info is None:
+                    info = model_info[model_name] = self.get_model_info(model_name)
+                model_type, api_provider = info
+                rows.append((
+                    model_name, model_type, record['tokens_used'], record['cost'],
+                    record.get('response_time', 0), record.get('status', 'success'),
+                    api_provider, record.get('request_type', 'chat')
+                ))
             
-            # 确定模型类型和提供商
-            model_type, api_provider = self.get_model_info(model_name)
-            
-            cursor.execute('''
-                INSERT INTO token_usage 
-                (model_name, model_type, tokens_used, cost, response_time, status, api_provider, request_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                model_name, model_type, tokens_used, cost, 
-                response_time, status, api_provider, request_type
-            ))
-            
-            conn.commit()
-            conn.close()
-            
-            print(f"✅ 记录成功: {model_name} - {tokens_used} tokens - ¥{cost}")
+            # with conn: 成功时提交，异常时回滚
+            with self._pool.acquire() as conn, conn:
+                conn.executemany(_RECORD_SQL, rows)
+            return True
             
         except Exception as e:
             print(f"❌ 记录失败: {e}")
+            return False
     
     def get_model_info(self, model_name: str) -> tuple:
         """获取模型信息"""
-        model_mapping = {
-            # Claude模型
-            'claude-3-5-sonnet-20241022': ('paid', 'anthropic'),
-            'claude-3-haiku-20240307': ('paid', 'anthropic'),
-            
-            # OpenAI模型
-            'gpt-4o': ('paid', 'openai'),
-            'gpt-4o-mini': ('paid', 'openai'),
-            'gpt-3.5-turbo': ('paid', 'openai'),
-            
-            # Google模型
-            'gemini-2.5-flash': ('free', 'google'),
-            'gemini-2.5-pro': ('free', 'google'),
-            'gemini-2.0-flash-exp': ('free', 'google'),
-            'gemini-pro': ('free', 'google'),
-            
-            # MinMax模型
-            'MiniMax-M2.1': ('free', 'minimax'),
-            'MiniMax-M2.1-lightning': ('free', 'minimax'),
-            
-            # 智谱AI模型
-            'glm-4': ('free', 'zhipuai'),
-            'glm-4-turbo': ('free', 'zhipuai'),
-            'glm-3-turbo': ('free', 'zhipuai'),
-            
-            # DeepSeek模型
-            'deepseek-chat': ('free', 'deepseek'),
-            
-            # Mistral模型
-            'mistral-large-2402': ('paid', 'mistral'),
-            'mistral-tiny': ('paid', 'mistral'),
-            
-            # Cohere模型
-            'command-r-plus': ('paid', 'cohere'),
-            'command-light': ('paid', 'cohere'),
-        }
-        
-        return model_mapping.get(model_name, ('unknown', 'unknown'))
+        return _MODEL_INFO.get(model_name, _UNKNOWN_MODEL_INFO)
     
     def simulate_usage_data(self, days: int = 7):
         """生成模拟使用数据"""
@@ -137,134 +271,147 @@ class TokenUsageRecorder:
         ]
         
         now = datetime.datetime.now()
+        # 模型类型和提供商按模型预先取出
+        entries = [(model, price_per_1k) + self.get_model_info(model) for model, price_per_1k in models]
         
-        for day in range(days):
-            date = now - datetime.timedelta(days=day)
-            
-            # 每天生成10-50条记录
-            daily_records = random.randint(10, 50)
+        # 每天生成10-50条记录
+        daily_counts = [random.randint(10, 50) for _ in range(days)]
+        total = sum(daily_counts)
+        
+        # 各随机量按总条数一次性批量抽取
+        picks = random.choices(entries, k=total)
+        # 随机生成token数量 (100-5000)
+        token_counts = random.choices(range(100, 5001), k=total)
+        # 随机生成响应时间 (500-3000ms)
+        response_times = random.choices(range(500, 3001), k=total)
+        # 随机生成状态 (90%成功)
+        rand = random.random
+        statuses = ['success' if rand() > 0.1 else 'error' for _ in range(total)]
+        # 生成随机时间戳（时、分）
+        hours = random.choices(range(24), k=total)
+        minutes = random.choices(range(60), k=total)
+        draws = zip(picks, token_counts, response_times, statuses, hours, minutes)
+        
+        # 时间戳（Unix秒）= 当天本地0点 + 时、分，秒与 now 相同
+        today = now.date()
+        rows = []
+        
+        for day, daily_records in enumerate(daily_counts):
+            midnight = datetime.datetime.combine(today - datetime.timedelta(days=day), datetime.time())
+            day_start = int(midnight.timestamp()) + now.second
             
-            for _ in range(daily_records):
-                model, price_per_1k = random.choice(models)
-                
-                # 随机生成token数量 (100-5000)
-                tokens = random.randint(100, 5000)
-                
+            for (model, price_per_1k, model_type, api_provider), tokens, response_time, status, hour, minute in islice(draws, daily_records):
                 # 计算成本
                 cost = (tokens / 1000) * price_per_1k
                 
-                # 随机生成响应时间 (500-3000ms)
-                response_time = random.randint(500, 3000)
-                
-                # 随机生成状态 (90%成功)
-                status = 'success' if random.random() > 0.1 else 'error'
-                
-                # 生成随机时间戳
-                hours = random.uniform(0, 24)
-                minutes = random.uniform(0, 60)
-                timestamp = date.replace(hour=int(hours), minute=int(minutes))
-                
-                try:
-                    conn = sqlite3.connect(self.db_path)
-                    cursor = conn.cursor()
-                    
-                    model_type, api_provider = self.get_model_info(model)
-                    
-                    cursor.execute('''
-                        INSERT INTO token_usage 
-                        (timestamp, model_name, model_type, tokens_used, cost, response_time, status, api_provider, request_type)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        timestamp, model, model_type, tokens, cost,
-                        response_time, status, api_provider, 'chat'
-                    ))
-                    
-                    conn.commit()
-                    conn.close()
-                    
-                except Exception as e:
-                    print(f"❌ 生成数据失败: {e}")
+                rows.append((
+                    day_start + hour * 3600 + minute * 60, model, model_type, tokens, cost,
+                    response_time, status, api_provider, 'chat'
+                ))
+        
+        # 全部记录在一个事务内批量写入，只提交一次
+        try:
+            with self._pool.acquire() as conn, conn:
+                conn.executemany(_SIMULATE_SQL, rows)
+            
+        except Exception as e:
+            print(f"❌ 生成数据失败: {e}")
+            return
         
         print(f"✅ 模拟数据生成完成！")
     
     def get_usage_summary(self, days: int = 7) -> Dict:
         """获取使用摘要"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as total_calls,
-                    SUM(tokens_used) as total_tokens,
-                    SUM(cost) as total_cost,
-                    AVG(response_time) as avg_response_time,
-                    COUNT(CASE WHEN status = 'success' THEN 1 END) as success_calls,
-                    COUNT(CASE WHEN model_type = 'free' THEN 1 END) as free_calls,
-                    COUNT(CASE WHEN model_type = 'paid' THEN 1 END) as paid_calls
-                FROM token_usage 
-                WHERE DATE(timestamp) >= DATE('now', '-{} days')
-            '''.format(days))
-            
-            result = cursor.fetchone()
-            
-            summary = {
-                'total_calls': result[0] or 0,
-                'total_tokens': result[1] or 0,
-                'total_cost': result[2] or 0,
-                'avg_response_time': result[3] or 0,
-                'success_calls': result[4] or 0,
-                'success_rate': (result[4] / result[0] * 100) if result[0] > 0 else 0,
-                'free_calls': result[5] or 0,
-                'paid_calls': result[6] or 0,
-                'period_days': days
-            }
-            
-            conn.close()
+            with self._pool.acquire() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT 
+                        COUNT(*) as total_calls,
+                        SUM(tokens_used) as total_tokens,
+                        SUM(cost) as total_cost,
+                        AVG(response_time) as avg_response_time,
+                        SUM(status = 'success') as success_calls,
+                        SUM(model_type = 'free') as free_calls,
+                        SUM(model_type = 'paid') as paid_calls
+                    FROM token_usage 
+                    WHERE timestamp >= {_SINCE_SQL}
+                ''', (f'-{days} days',))
+                
+                result = cursor.fetchone()
+                
+                summary = {
+                    'total_calls': result[0] or 0,
+                    'total_tokens': result[1] or 0,
+                    'total_cost': result[2] or 0,
+                    'avg_response_time': result[3] or 0,
+                    'success_calls': result[4] or 0,
+                    'success_rate': (result[4] / result[0] * 100) if result[0] > 0 else 0,
+                    'free_calls': result[5] or 0,
+                    'paid_calls': result[6] or 0,
+                    'period_days': days
+                }
+                
             return summary
             
         except Exception as e:
             print(f"❌ 获取摘要失败: {e}")
             return {}
     
-    def export_data(self, format: str = 'json', days: int = 30) -> str:
-        """导出数据"""
+    def export_data(self, format: str = 'json', days: int = 30,
+                    output_path: Optional[str] = None) -> str:
+        """导出数据
+        
+        逐行读取游标边读边写，不先取回全部记录；指定 output_path 时直接写入文件并返回该路径，
+        否则返回导出内容。
+        """
+        if format not in ('json', 'csv'):
+            return ""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM token_usage 
-                WHERE DATE(timestamp) >= DATE('now', '-{} days')
-                ORDER BY timestamp DESC
-            '''.format(days))
-            
-            rows = cursor.fetchall()
-            columns = [description[0] for description in cursor.description]
-            
-            conn.close()
-            
-            if format == 'json':
-                data = []
-                for row in rows:
-                    data.append(dict(zip(columns, row)))
-                return json.dumps(data, indent=2, ensure_ascii=False)
-            
-            elif format == 'csv':
-                import csv
-                import io
+            with self._pool.acquire() as conn:
+                cursor = conn.cursor()
                 
-                output = io.StringIO()
-                writer = csv.writer(output)
-                writer.writerow(columns)
-                writer.writerows(rows)
-                return output.getvalue()
-            
-            return ""
+                cursor.execute(f'''
+                    SELECT * FROM token_usage 
+                    WHERE timestamp >= {_SINCE_SQL}
+                    ORDER BY timestamp DESC
+                ''', (f'-{days} days',))
+                
+                columns = [description[0] for description in cursor.description]
+                
+                if output_path is None:
+                    output = io.StringIO()
+                    self._write_export(output, format, columns, cursor)
+                    return output.getvalue()
+                
+                with open(output_path, 'w', encoding='utf-8', newline='') as f:
+                    self._write_export(f, format, columns, cursor)
+                return output_path
             
         except Exception as e:
             print(f"❌ 导出失败: {e}")
             return ""
+    
+    @staticmethod
+    def _write_export(f, format: str, columns: List[str], rows):
+        """将记录逐行写入文本流
+
+        JSON 为 {"columns": [...], "rows": [[...], ...]}：列名只写一次，每行为一个数组，
+        不为每条记录构造字典。
+        """
+        if format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+            return
+        
+        f.write('{\n  "columns": ' + json.dumps(columns, ensure_ascii=False) + ',\n  "rows": [')
+        separator = '\n    '
+        for row in rows:
+            f.write(separator + json.dumps(row, ensure_ascii=False))
+            separator = ',\n    '
+        f.write(']\n}' if separator == '\n    ' else '\n  ]\n}')
 
 def main():
     """主函数"""
@@ -307,15 +454,11 @@ def main():
         days = input("导出多少天的数据? (默认30天): ").strip()
         days = int(days) if days else 30
         
-        data = recorder.export_data(format_choice, days)
-        
         filename = f"token_usage_{days}days.{format_choice}"
         filepath = f"/Users/leiyuanwu/网页小游/token-monitor/{filename}"
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(data)
-        
-        print(f"✅ 数据已导出到: {filepath}")
+        if recorder.export_data(format_choice, days, output_path=filepath):
+            print(f"✅ 数据已导出到: {filepath}")
         
     elif choice == '4':
         model = input("模型名称: ").strip()
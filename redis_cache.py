@@ -6,10 +6,44 @@ Redis缓存模块
 
 import json
 import os
-from typing import Optional, Any
+import threading
+import time
+from typing import Optional, Any, Dict, List
 import redis
 from datetime import timedelta
 
+from cachetools import TLRUCache
+
+# 缓存值以bytes存取，优先使用orjson编解码，未安装时回退到标准json
+try:
+    import orjson
+
+    def _dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(value: Any) -> bytes:
+        return json.dumps(value, default=str).encode()
+
+    _loads = json.loads
+
+# 缓存值默认使用msgpack二进制编码（数值密集的记录体积更小、编解码更快），
+# REDIS_CACHE_CODEC=json 或未安装msgpack时沿用上面的JSON编解码
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+if msgpack is not None and os.getenv("REDIS_CACHE_CODEC", "msgpack").lower() == "msgpack":
+    def _pack(value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True, default=str)
+
+    def _unpack(data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+else:
+    _pack, _unpack = _dumps, _loads
+
 # Redis配置
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
@@ -24,6 +58,33 @@ CACHE_TTL = {
     "health": 30,           # 30秒
 }
 
+# clear_pattern 每次SCAN的提示条数及每条UNLINK的键数
+CLEAR_BATCH_SIZE = 500
+
+# Redis不可用时内存缓存的最大条目数
+MEMORY_CACHE_SIZE = 10000
+
+# get_stats 结果在本地复用的秒数，限制INFO/DBSIZE的调用频率
+STATS_CACHE_TTL = 5
+
+# 模块级连接池，所有CacheManager实例共享；连接用尽时等待空闲连接而非直接报错。
+# 安装hiredis后redis-py自动使用其C实现的协议解析器
+_pool = redis.BlockingConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    password=REDIS_PASSWORD,
+    max_connections=32,
+    timeout=2,
+    socket_connect_timeout=2,
+    socket_timeout=2
+)
+
+
+def _memory_ttu(_key, value, now):
+    """内存缓存条目为(ttl, 值)，按各自的TTL过期"""
+    return now + value[0]
+
 
 class CacheManager:
     """Redis缓存管理器"""
@@ -31,66 +92,107 @@ class CacheManager:
     def __init__(self):
         self.client: Optional[redis.Redis] = None
         self.enabled = False
+        # 内存缓存先于连接创建：条目数有上限（LRU淘汰）并按TTL过期，访问加锁保证线程安全
+        self._memory_cache = TLRUCache(maxsize=MEMORY_CACHE_SIZE, ttu=_memory_ttu)
+        self._memory_lock = threading.RLock()
+        # (计算时间, 结果)，仅缓存Redis状态
+        self._stats_cache = (0.0, None)
+        self._stats_lock = threading.Lock()
         self._connect()
     
     def _connect(self):
         """连接Redis"""
         try:
-            self.client = redis.Redis(
-                host=REDIS_HOST,
-                port=REDIS_PORT,
-                db=REDIS_DB,
-                password=REDIS_PASSWORD,
-                decode_responses=True,
-                socket_connect_timeout=2,
-                socket_timeout=2
-            )
+            self.client = redis.Redis(connection_pool=_pool)
             self.client.ping()
             self.enabled = True
             print("✅ Redis缓存已启用")
         except redis.ConnectionError:
             print("⚠️ Redis连接失败，使用内存缓存")
-            self.client = None
-            self._memory_cache = {}
+            self._use_memory_cache()
         except Exception as e:
             print(f"⚠️ Redis初始化失败: {e}")
-            self.client = None
-            self._memory_cache = {}
+            self._use_memory_cache()
+    
+    def _use_memory_cache(self):
+        """切换到内存缓存"""
+        self.client = None
     
     def get(self, key: str) -> Optional[Any]:
         """获取缓存"""
-        if not self.enabled or self.client is None:
-            return self._memory_cache.get(key)
+        client = self.client
+        if not self.enabled or client is None:
+            mc = self._memory_cache
+            with self._memory_lock:
+                entry = mc.get(key)
+            return entry[1] if entry is not None else None
         
         try:
-            value = self.client.get(key)
+            value = client.get(key)
             if value:
-                return json.loads(value)
+                return _unpack(value)
         except Exception:
             pass
         return None
     
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """批量获取缓存（单次MGET往返），顺序与keys一致，未命中为None"""
+        if not keys:
+            return []
+        if not self.enabled or self.client is None:
+            with self._memory_lock:
+                entries = [self._memory_cache.get(key) for key in keys]
+            return [entry[1] if entry is not None else None for entry in entries]
+        
+        try:
+            return [_unpack(value) if value else None for value in self.client.mget(keys)]
+        except Exception:
+            return [None] * len(keys)
+    
     def set(self, key: str, value: Any, ttl: int = 300) -> bool:
         """设置缓存"""
-        if not self.enabled or self.client is None:
-            self._memory_cache[key] = value
+        client = self.client
+        if not self.enabled or client is None:
+            mc = self._memory_cache
+            with self._memory_lock:
+                mc[key] = (ttl, value)
             return True
         
         try:
-            serialized = json.dumps(value, default=str)
-            self.client.setex(key, ttl, serialized)
+            serialized = _pack(value)
+            client.setex(key, ttl, serialized)
             return True
         except Exception:
             return False
     
+    def set_many(self, items: Dict[str, Any], ttl: int = 300) -> int:
+        """批量设置缓存（管道一次往返）"""
+        if not self.enabled or self.client is None:
+            with self._memory_lock:
+                for key, value in items.items():
+                    self._memory_cache[key] = (ttl, value)
+            return len(items)
+        
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(key, ttl, _pack(value))
+            pipe.execute()
+            return len(items)
+        except Exception:
+            return 0
+    
     def delete(self, key: str) -> bool:
         """删除缓存"""
-        if not self.enabled or self.client is None:
-            self._memory_cache.pop(key, None)
+        client = self.client
+        if not self.enabled or client is None:
+            mc = self._memory_cache
+            with self._memory_lock:
+                mc.pop(key, None)
             return True
         
         try:
-            self.client.delete(key)
+            client.delete(key)
             return True
         except Exception:
             return False
@@ -98,15 +200,21 @@ class CacheManager:
     def clear_pattern(self, pattern: str) -> int:
         """清除匹配的缓存"""
         if not self.enabled or self.client is None:
-            keys = [k for k in self._memory_cache if k.startswith(pattern.replace("*", ""))]
-            for k in keys:
-                del self._memory_cache[k]
+            prefix = pattern.replace("*", "")
+            with self._memory_lock:
+                keys = [k for k in self._memory_cache if k.startswith(prefix)]
+                for k in keys:
+                    self._memory_cache.pop(k, None)
             return len(keys)
         
+        # SCAN增量遍历不会阻塞Redis，UNLINK在后台线程释放内存，按批放入同一管道
         try:
-            keys = self.client.keys(pattern)
+            keys = list(self.client.scan_iter(match=pattern, count=CLEAR_BATCH_SIZE))
             if keys:
-                return self.client.delete(*keys)
+                pipe = self.client.pipeline(transaction=False)
+                for start in range(0, len(keys), CLEAR_BATCH_SIZE):
+                    pipe.unlink(*keys[start:start + CLEAR_BATCH_SIZE])
+                return sum(pipe.execute())
         except Exception:
             pass
         return 0
@@ -114,19 +222,29 @@ class CacheManager:
     def get_stats(self) -> dict:
         """获取缓存状态"""
         if not self.enabled or self.client is None:
-            return {"enabled": False, "type": "memory", "keys": len(self._memory_cache)}
+            with self._memory_lock:
+                self._memory_cache.expire()
+                keys = len(self._memory_cache)
+            return {"enabled": False, "type": "memory", "keys": keys}
         
-        try:
-            info = self.client.info("stats")
-            return {
-                "enabled": True,
-                "type": "redis",
-                "keys": len(self.client.keys("*")),
-                "memory": info.get("used_memory_human", "N/A"),
-                "connections": info.get("connected_clients", 0)
-            }
-        except Exception:
-            return {"enabled": False, "error": "cannot get stats"}
+        with self._stats_lock:
+            now = time.monotonic()
+            computed_at, stats = self._stats_cache
+            if stats is not None and now - computed_at < STATS_CACHE_TTL:
+                return stats
+            try:
+                info = self.client.info("stats")
+                stats = {
+                    "enabled": True,
+                    "type": "redis",
+                    "keys": self.client.dbsize(),
+                    "memory": info.get("used_memory_human", "N/A"),
+                    "connections": info.get("connected_clients", 0)
+                }
+            except Exception:
+                return {"enabled": False, "error": "cannot get stats"}
+            self._stats_cache = (now, stats)
+            return stats
 
 
 # 全局缓存实例
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+DatabaseManager 与 recorder 共用同一 token_usage.db 的兼容性检查
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_models import DatabaseManager, TokenUsage
+from recorder import TokenUsageRecorder
+
+
+class SharedDatabaseTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        # 最先注册、最后执行：连接关闭后再删除目录
+        self.addCleanup(tmp.cleanup)
+        self.db_path = os.path.join(tmp.name, "token_usage.db")
+
+    def _recorder(self) -> TokenUsageRecorder:
+        recorder = TokenUsageRecorder(self.db_path)
+        self.addCleanup(recorder._pool.close)
+        recorder.init_database()
+        return recorder
+
+    def _manager(self) -> DatabaseManager:
+        manager = DatabaseManager(self.db_path)
+        self.addCleanup(manager.close)
+        return manager
+
+    def test_manager_then_recorder(self):
+        """DatabaseManager 建库后 recorder 写入的记录两边都能查到"""
+        manager = self._manager()
+        manager.insert_token_usage(TokenUsage(
+            timestamp=datetime.now(), model_name="gpt-4o", model_type="paid",
+            tokens_used=100, cost=0.5, api_provider="openai"
+        ))
+        recorder = self._recorder()
+        recorder.record_api_usage('glm-4', 200, 0.1)
+
+        summary = recorder.get_usage_summary(7)
+        self.assertEqual(summary['total_calls'], 2)
+        self.assertEqual(summary['total_tokens'], 300)
+        self.assertEqual(len(manager.get_usage_data()), 2)
+
+    def test_simulated_data_visible_to_both(self):
+        """recorder 生成的模拟数据两边统计一致"""
+        manager = self._manager()
+        recorder = self._recorder()
+        recorder.simulate_usage_data(2)
+        count = recorder.get_usage_summary(7)['total_calls']
+        self.assertGreater(count, 0)
+
+        stats = manager.get_usage_stats()
+        self.assertEqual(stats.total_calls, count)
+
+    def test_legacy_text_timestamps_migrated(self):
+        """旧版 recorder 写入的文本时间戳迁移后仍计入摘要"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                CREATE TABLE token_usage (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    model_name TEXT NOT NULL,
+                    model_type TEXT NOT NULL,
+                    tokens_used INTEGER NOT NULL,
+                    cost REAL NOT NULL,
+                    response_time INTEGER,
+                    status TEXT DEFAULT 'success',
+                    api_provider TEXT,
+                    request_type TEXT,
+                    user_id TEXT DEFAULT 'default'
+                )
+            ''')
+            conn.execute(
+                "INSERT INTO token_usage (model_name, model_type, tokens_used, cost) "
+                "VALUES ('glm-4', 'free', 50, 0.0)"
+            )
+        conn.close()
+
+        recorder = self._recorder()
+        self.assertEqual(recorder.get_usage_summary(7)['total_calls'], 1)
+        with sqlite3.connect(self.db_path) as conn:
+            kind = conn.execute("SELECT typeof(timestamp) FROM token_usage").fetchone()[0]
+        conn.close()
+        self.assertEqual(kind, 'integer')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+列式使用记录存储模块
+企业版Token监控系统
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import compress, islice, repeat
+from operator import and_, contains, countOf, eq, or_
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# 追加缓冲达到该条数时写入列
+FLUSH_SIZE = 64
+
+
+class UsageRow(NamedTuple):
+    """单条使用记录，字段名与原字典记录的键一致"""
+    timestamp: Optional[str] = None
+    model_name: Optional[str] = None
+    model: Optional[str] = None
+    tokens_used: Optional[int] = None
+    tokens: Optional[int] = None
+    cost: Optional[float] = None
+    provider: Optional[str] = None
+    session_id: Optional[str] = None
+    type: Optional[str] = None
+    responseTime: Optional[int] = None
+    status: Optional[str] = None
+
+
+def to_row(item: Any) -> UsageRow:
+    """字典记录转换为 UsageRow，缺失的字段为 None"""
+    if isinstance(item, UsageRow):
+        return item
+    return UsageRow._make(map(item.get, UsageRow._fields))
+
+
+def _timestamp_of(row: UsageRow) -> str:
+    return row.timestamp or ""
+
+
+def _span(column, lo: int, hi: int):
+    """列 [lo, hi) 区间的只读迭代视图，不复制列"""
+    if lo == 0 and hi == len(column):
+        return column
+    return islice(column, lo, hi)
+
+
+class UsageStore:
+    """usage_data 的列式索引
+
+    rows 以 UsageRow 元组保存（比字典记录小数倍），
+    过滤用到的字段另按列保存，过滤条件组合为惰性的布尔掩码，
+    由 map/compress 在 C 层逐行求值，避免逐条访问字典。
+    记录按时间戳升序保存，日期范围通过二分查找直接定位。
+    """
+
+    def __init__(self, rows: Optional[List[Any]] = None):
+        self.reset([] if rows is None else rows)
+
+    def reset(self, rows: List[Any]):
+        """绑定新的记录列表（原地转换为 UsageRow 并按时间排序）并重建列"""
+        rows[:] = map(to_row, rows)
+        rows.sort(key=_timestamp_of)
+        self.rows = rows
+        self.timestamps: List[str] = []
+        self.dates: List[str] = []
+        self.model_names: List[str] = []
+        self.model_names_lower: List[str] = []
+        self.models_lower: List[str] = []
+        self.providers: List[str] = []
+        self.providers_lower: List[str] = []
+        self.statuses: List[str] = []
+        self.tokens = array("q")
+        self.costs = array("d")
+        # 全量累计值，写入时增量维护
+        self.total_tokens = 0
+        self.total_cost = 0.0
+        self.model_counts: Counter = Counter()
+        self.provider_counts: Counter = Counter()
+        self._indexed = 0
+        self.flush()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def append(self, record: Any):
+        """追加记录（字典或 UsageRow），列按批写入"""
+        self.rows.append(to_row(record))
+        if len(self.rows) - self._indexed >= FLUSH_SIZE:
+            self.flush()
+
+    def extend(self, records: Iterable[Any]):
+        """批量追加记录"""
+        self.rows.extend(map(to_row, records))
+        self.flush()
+
+    def flush(self):
+        """将尚未写入列的记录按时间顺序插入"""
+        pending = self.rows[self._indexed:]
+        if not pending:
+            return
+        del self.rows[self._indexed:]
+        columns = (
+            self.rows, self.timestamps, self.dates, self.model_names,
+            self.model_names_lower, self.models_lower, self.providers,
+            self.providers_lower, self.statuses, self.tokens, self.costs,
+        )
+        model_counts, provider_counts = self.model_counts, self.provider_counts
+        for item in pending:
+            timestamp = _timestamp_of(item)
+            model_name = item.model_name or ""
+            provider = item.provider or ""
+            tokens, cost = item.tokens or 0, item.cost or 0.0
+            values = (
+                item, timestamp, timestamp[:10], model_name,
+                model_name.lower(), (item.model or "").lower(),
+                provider, provider.lower(), item.status or "",
+                tokens, cost,
+            )
+            self.total_tokens += tokens
+            self.total_cost += cost
+            model_counts[model_name] += 1
+            provider_counts[provider] += 1
+            if not self.timestamps or timestamp >= self.timestamps[-1]:
+                for column, value in zip(columns, values):
+                    column.append(value)
+            else:
+                pos = bisect_right(self.timestamps, timestamp)
+                for column, value in zip(columns, values):
+                    column.insert(pos, value)
+        self._indexed = len(self.rows)
+
+    def select(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        provider: Optional[str] = None,
+        provider_ignore_case: bool = False,
+        model_names: Optional[FrozenSet[str]] = None,
+        search: Optional[str] = None,
+        search_model_alias: bool = False,
+    ) -> Sequence[int]:
+        """返回满足全部条件的行号（升序）
+
+        日期为 YYYY-MM-DD 闭区间；search 为小写子串，
+        search_model_alias 为真时同时匹配简化模型名。
+        仅启用的条件会加入掩码链，未启用的条件没有逐行开销；
+        日期条件不逐行比较，直接确定行号区间。
+        """
+        self.flush()
+        lo, hi = self.date_bounds(start_date, end_date)
+        masks = []
+        if provider:
+            if provider_ignore_case:
+                masks.append(map(eq, _span(self.providers_lower, lo, hi), repeat(provider.lower())))
+            else:
+                masks.append(map(eq, _span(self.providers, lo, hi), repeat(provider)))
+        if model_names is not None:
+            masks.append(map(model_names.__contains__, _span(self.model_names, lo, hi)))
+        if search:
+            found = map(contains, _span(self.model_names_lower, lo, hi), repeat(search))
+            if search_model_alias:
+                found = map(or_, found, map(contains, _span(self.models_lower, lo, hi), repeat(search)))
+            masks.append(found)
+
+        indices = range(lo, hi)
+        if not masks:
+            return indices
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = map(and_, mask, other)
+        return list(compress(indices, mask))
+
+    def date_bounds(self, start_date: Optional[str] = None,
+                    end_date: Optional[str] = None) -> Tuple[int, int]:
+        """日期闭区间对应的行号范围 [lo, hi)"""
+        lo = bisect_left(self.dates, start_date) if start_date else 0
+        hi = bisect_right(self.dates, end_date) if end_date else len(self.dates)
+        return lo, max(lo, hi)
+
+    def aggregate(self, indices: Sequence[int], provider: Optional[str] = None,
+                  model_names: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        """汇总选中行的Token、成本、成功数及模型/供应商分布
+
+        各指标为独立的 C 层归约（sum/countOf/Counter），实测快于逐行同时累加
+        全部指标的单次 Python 循环；已由精确过滤条件确定的分布直接给出，不再扫描该列。
+        """
+        count = len(indices)
+        if isinstance(indices, range) and indices.step == 1:
+            lo, hi = indices.start, indices.stop
+
+            def column(values):
+                return _span(values, lo, hi)
+        else:
+            def column(values):
+                return map(values.__getitem__, indices)
+
+        if model_names is not None and len(model_names) == 1 and count:
+            model_distribution = dict.fromkeys(model_names, count)
+        else:
+            model_distribution = dict(Counter(column(self.model_names)))
+        if provider and count:
+            provider_distribution = {provider: count}
+        else:
+            provider_distribution = dict(Counter(column(self.providers)))
+        return {
+            "total_tokens": sum(column(self.tokens)),
+            "total_cost": sum(column(self.costs)),
+            "total_requests": count,
+            "success_count": countOf(column(self.statuses), "success"),
+            "model_distribution": model_distribution,
+            "provider_distribution": provider_distribution,
+        }
+
+    def date_span(self) -> Optional[Tuple[str, str]]:
+        """有时间戳记录的最早/最晚日期，无记录时为 None"""
+        self.flush()
+        first = bisect_right(self.timestamps, "")
+        if first == len(self.timestamps):
+            return None
+        return self.dates[first], self.dates[-1]
+
+    def take(self, indices: Iterable[int]) -> List[UsageRow]:
+        """按行号取回记录"""
+        return list(map(self.rows.__getitem__, indices))
+
+    def records(self) -> List[Dict[str, Any]]:
+        """全部记录转换为字典（用于导出等需要原始结构的场景）"""
+        return [row._asdict() for row in self.rows]